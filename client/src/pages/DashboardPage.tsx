@@ -37,8 +37,10 @@ export default function DashboardPage() {
     const fetchData = async () => {
       try {
         const [transactionsRes, statusRes] = await Promise.all([
+          // The totals below need every transaction, not just the first page
           axios.get("http://localhost:8000/transactions", {
-            headers: { Authorization: `Bearer ${token}` }
+            headers: { Authorization: `Bearer ${token}` },
+            params: { limit: 0 }
           }),
           axios.get("http://localhost:8000/transactions/status", {
             headers: { Authorization: `Bearer ${token}` }
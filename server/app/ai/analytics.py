@@ -0,0 +1,280 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.model import Category, Transaction, TransactionType
+
+# Months of each series returned in metrics["advanced"]; older months are
+# still used for the statistics, just not listed.
+ADVANCED_SERIES_MONTHS = int(os.getenv("ADVANCED_SERIES_MONTHS", "12"))
+# A transaction is flagged when it is this many standard deviations above its category's mean
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))
+# Anomalies are looked for among the most recent expenses only, so the
+# per-row read stays bounded however long the history is
+ANOMALY_WINDOW_DAYS = int(os.getenv("ANOMALY_WINDOW_DAYS", "90"))
+ANOMALY_MAX_ROWS = int(os.getenv("ANOMALY_MAX_ROWS", "2000"))
+# Categories need this many expenses (including the one tested) before their outliers are meaningful
+ANOMALY_MIN_SAMPLES = 5
+# Floor on the spread, as a fraction of the mean, so a category whose other
+# expenses are all identical doesn't divide by zero
+ANOMALY_MIN_SPREAD = 0.1
+MAX_ANOMALIES = 10
+# Complete months the forecast trend is fitted on
+FORECAST_MONTHS = 6
+
+
+@dataclass
+class MonthlyTotals:
+    """A user's monthly rollup as parallel typed arrays, one element per (month, category, type)."""
+    months: np.ndarray  # int64 months since 1970-01
+    totals: np.ndarray  # float64
+    is_income: np.ndarray  # bool
+    categories: np.ndarray  # int16 index into category_names
+    category_names: List[str]
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+
+@dataclass
+class RecentExpenses:
+    """A user's latest expenses as parallel typed arrays, one element per transaction."""
+    days: np.ndarray  # int64 days since 1970-01-01
+    amounts: np.ndarray  # float64
+    categories: np.ndarray  # int16 index into category_names
+    category_names: List[str]
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+def _category_codes():
+    names: List[str] = []
+    codes: Dict[str, int] = {}
+
+    def code_for(name: str) -> int:
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+        return codes[name]
+
+    return names, code_for
+
+
+def monthly_totals(rows: Iterable) -> MonthlyTotals:
+    """Arrays from rollup rows with month ("YYYY-MM"), name, transaction_type and total."""
+    names, code_for = _category_codes()
+    months, totals, is_income, categories = [], [], [], []
+    for row in rows:
+        months.append(row.month)
+        totals.append(row.total)
+        is_income.append(row.transaction_type == TransactionType.INCOME)
+        categories.append(code_for(row.name))
+    return MonthlyTotals(
+        months=np.array(months, dtype="datetime64[M]").astype(np.int64),
+        totals=np.array(totals, dtype=np.float64),
+        is_income=np.array(is_income, dtype=bool),
+        categories=np.array(categories, dtype=np.int16),
+        category_names=names,
+    )
+
+
+def load_recent_expenses(db: Session, user_id: UUID, today: Optional[datetime] = None) -> RecentExpenses:
+    """The last ANOMALY_WINDOW_DAYS of expenses, newest first, at most ANOMALY_MAX_ROWS.
+
+    A range scan on the (user_id, created_at, id) index.
+    """
+    since = (today or datetime.utcnow()) - timedelta(days=ANOMALY_WINDOW_DAYS)
+    rows = db.execute(
+        select(Transaction.created_at, Transaction.amount, Category.name)
+        .join(Category, Transaction.category_id == Category.id)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= since,
+            Transaction.transaction_type == TransactionType.EXPENSE,
+        )
+        .order_by(Transaction.created_at.desc())
+        .limit(ANOMALY_MAX_ROWS)
+    ).all()
+
+    names, code_for = _category_codes()
+    if not rows:
+        return RecentExpenses(np.empty(0, np.int64), np.empty(0, np.float64), np.empty(0, np.int16), names)
+    created_at, amount, category = zip(*rows)
+    return RecentExpenses(
+        days=np.array(created_at, dtype="datetime64[D]").astype(np.int64),
+        amounts=np.array(amount, dtype=np.float64),
+        categories=np.fromiter((code_for(name) for name in category), dtype=np.int16, count=len(rows)),
+        category_names=names,
+    )
+
+
+def _month_label(month: int) -> str:
+    return str(np.datetime64(month, "M"))
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # Mean of the trailing `window` months; shorter at the start of the history
+    sums = np.cumsum(values)
+    shifted = np.concatenate([np.zeros(window), sums[:-window]]) if len(values) > window else np.zeros(len(values))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return (sums - shifted[:len(values)]) / counts
+
+
+def _pct_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+
+
+def _rounded(values: np.ndarray, digits: int = 2) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def analyze_history(
+    totals: MonthlyTotals, recent: RecentExpenses, current_balance: float, today: Optional[datetime] = None
+) -> Dict:
+    """Rolling averages, month-over-month deltas, savings rate, anomalies and a forecast.
+
+    The series come from month x category matrices built with bincount
+    over the rollup rows, so the cost is O(months x categories) however
+    many transactions there are. Only the anomalies look at individual
+    transactions, and only at the recent window. The current calendar
+    month is shown in the series but left out of month-over-month
+    comparisons and the forecast, since it is incomplete.
+    """
+    if len(totals) == 0:
+        return {}
+
+    today = today or datetime.utcnow()
+    first = int(totals.months.min())
+    current = int(np.datetime64(today, "M").astype(np.int64))
+    span = max(int(totals.months.max()), current) - first + 1
+    month = totals.months - first
+    n_categories = len(totals.category_names)
+
+    income = np.bincount(month[totals.is_income], weights=totals.totals[totals.is_income], minlength=span)
+    expense_mask = ~totals.is_income
+    expense_cells = month[expense_mask] * n_categories + totals.categories[expense_mask]
+    by_category = np.bincount(
+        expense_cells, weights=totals.totals[expense_mask], minlength=span * n_categories
+    ).reshape(span, n_categories)
+    expenses = by_category.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        savings_rate = np.where(income > 0, (income - expenses) / income * 100, np.nan)
+
+    shown = slice(max(0, span - ADVANCED_SERIES_MONTHS), span)
+    advanced = {
+        "months": [_month_label(first + i) for i in range(span)][shown],
+        "rolling_expenses_3m": _rounded(_rolling_mean(expenses, 3)[shown]),
+        "rolling_expenses_6m": _rounded(_rolling_mean(expenses, 6)[shown]),
+        "rolling_income_3m": _rounded(_rolling_mean(income, 3)[shown]),
+        "savings_rate_pct": _rounded(savings_rate[shown], 1),
+    }
+
+    # Month-over-month per category, between the last two complete months
+    complete = span - (1 if first + span - 1 == current else 0)
+    if complete >= 2:
+        latest, previous = by_category[complete - 1], by_category[complete - 2]
+        change = _pct_change(latest, previous)
+        active = (latest > 0) | (previous > 0)
+        advanced["category_mom"] = {
+            "month": _month_label(first + complete - 1),
+            "changes": {
+                totals.category_names[i]: {
+                    "previous": round(float(previous[i]), 2),
+                    "current": round(float(latest[i]), 2),
+                    "change_pct": None if np.isnan(change[i]) else round(float(change[i]), 1),
+                }
+                for i in np.flatnonzero(active)
+            },
+        }
+
+    advanced["anomalies"] = _anomalies(recent)
+    if complete >= 2:
+        advanced["forecast"] = _forecast(income[:complete], expenses[:complete], current_balance)
+    return advanced
+
+
+def _anomalies(recent: RecentExpenses) -> List[Dict]:
+    # Each expense is scored against the other expenses in its category
+    # (leave-one-out). Including the point in its own mean and spread caps z
+    # at (n-1)/sqrt(n), which would hide outliers in small categories.
+    categories = recent.categories
+    amounts = recent.amounts
+    n_categories = len(recent.category_names)
+    counts = np.bincount(categories, minlength=n_categories)
+    sums = np.bincount(categories, weights=amounts, minlength=n_categories)
+    squares = np.bincount(categories, weights=amounts * amounts, minlength=n_categories)
+
+    others = counts[categories] - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = (sums[categories] - amounts) / others
+        variance = (squares[categories] - amounts * amounts) / others - mean * mean
+        std = np.maximum(np.sqrt(np.maximum(variance, 0)), ANOMALY_MIN_SPREAD * mean)
+        z = (amounts - mean) / std
+
+    eligible = (counts[categories] >= ANOMALY_MIN_SAMPLES) & (mean > 0)
+    flagged = np.flatnonzero(eligible & (z >= ANOMALY_Z_THRESHOLD))
+    if len(flagged) > MAX_ANOMALIES:
+        flagged = flagged[np.argpartition(-z[flagged], MAX_ANOMALIES)[:MAX_ANOMALIES]]
+    flagged = flagged[np.argsort(-z[flagged])]
+
+    return [
+        {
+            "date": str(np.datetime64(int(recent.days[i]), "D")),
+            "category": recent.category_names[categories[i]],
+            "amount": round(float(amounts[i]), 2),
+            "category_mean": round(float(mean[i]), 2),
+            "z_score": round(float(z[i]), 1),
+        }
+        for i in flagged
+    ]
+
+
+def _forecast(income: np.ndarray, expenses: np.ndarray, current_balance: float) -> Dict:
+    """Next month from a least-squares line through the last few complete months."""
+    window = min(FORECAST_MONTHS, len(income))
+    x = np.arange(window)
+    # Fit both series in one call: columns are income and expenses
+    slope, intercept = np.polyfit(x, np.column_stack([income[-window:], expenses[-window:]]), 1)
+    next_income, next_expenses = np.maximum(slope * window + intercept, 0)
+    return {
+        "based_on_months": window,
+        "next_month_income": round(float(next_income), 2),
+        "next_month_expenses": round(float(next_expenses), 2),
+        "next_month_net": round(float(next_income - next_expenses), 2),
+        "projected_balance": round(float(current_balance + next_income - next_expenses), 2),
+    }
+
+
+def advanced_summary(advanced: Dict) -> Dict:
+    """The parts of metrics["advanced"] worth spending prompt tokens on."""
+    if not advanced:
+        return {}
+    summary = {
+        "rolling_expenses_3m": advanced["rolling_expenses_3m"][-1],
+        "rolling_expenses_6m": advanced["rolling_expenses_6m"][-1],
+        "savings_rate_pct_recent": [rate for rate in advanced["savings_rate_pct"][-6:] if rate is not None],
+    }
+    if "category_mom" in advanced:
+        changes = [
+            (name, change["change_pct"]) for name, change in advanced["category_mom"]["changes"].items()
+            if change["change_pct"] is not None
+        ]
+        changes.sort(key=lambda item: abs(item[1]), reverse=True)
+        summary["biggest_category_changes_pct"] = dict(changes[:5])
+    if advanced["anomalies"]:
+        summary["unusual_expenses"] = [
+            f"{a['date']} {a['category']} {a['amount']:.0f} (usual {a['category_mean']:.0f})"
+            for a in advanced["anomalies"][:3]
+        ]
+    if "forecast" in advanced:
+        summary["forecast_next_month"] = {
+            key: advanced["forecast"][key] for key in ("next_month_income", "next_month_expenses", "projected_balance")
+        }
+    return summary
@@ -0,0 +1,38 @@
+import os
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.db.versions import data_state
+from app.utils.cache import TTLCache
+
+INSIGHTS_CACHE_SIZE = int(os.getenv("INSIGHTS_CACHE_SIZE", "1024"))
+INSIGHTS_CACHE_TTL = float(os.getenv("INSIGHTS_CACHE_TTL", "3600"))
+
+# user_id -> (fingerprint, insights). One entry per user, so a stale
+# result is simply overwritten by the next computation.
+insights_cache = TTLCache(maxsize=INSIGHTS_CACHE_SIZE, ttl=INSIGHTS_CACHE_TTL)
+
+
+def data_fingerprint(db: Session, user_id: UUID) -> Tuple[int, float]:
+    """(data version, initial balance): everything the insights depend on.
+
+    The version changes with every transaction or balance write, so this
+    is one primary key lookup rather than a scan. The balance is read in
+    the same lookup, so it always matches the version.
+    """
+    version, initial_balance = data_state(db, user_id)
+    return (version, initial_balance or 0)
+
+
+def get_cached_insights(user_id: UUID, fingerprint: Tuple) -> Optional[Dict]:
+    # An entry computed from older data (e.g. written by another worker) counts as a miss
+    entry = insights_cache.get(user_id, valid=lambda entry: entry[0] == fingerprint)
+    return entry[1] if entry else None
+
+
+def store_insights(user_id: UUID, fingerprint: Tuple, insights: Dict):
+    insights_cache.set(user_id, (fingerprint, insights))
+
+
+def invalidate_insights(user_id: UUID):
+    insights_cache.pop(user_id)
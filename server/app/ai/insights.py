@@ -1,12 +1,24 @@
 import os
 import json
-from typing import List, Dict
-from dotenv import load_dotenv
-import google.generativeai as genai
-from app.db.model import Transaction
+import logging
+import time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Dict, Iterator, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.ai.analytics import advanced_summary
+from app.ai.cache import data_fingerprint, get_cached_insights, store_insights
+from app.ai.metrics import compute_metrics
+from app.ai.providers import get_provider
+from app.observability.metrics import count_llm_error, observe_llm_call
+from app.observability.profiling import record_llm_call
+from app.utils.concurrency import ConcurrencyLimiter, SingleFlight
 
 import re
 
+logger = logging.getLogger(__name__)
+
 def extract_json(text: str) -> str:
     # Removes triple backticks and anything before/after them
     match = re.search(r"```(?:json)?\s*({.*?})\s*```", text, re.DOTALL)
@@ -14,61 +26,61 @@ def extract_json(text: str) -> str:
         return match.group(1).strip()
     return text.strip()  # fallback
 
-# Load API Key from environment variable
-load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not API_KEY:
-    raise ValueError(" ERROR: GEMINI_API_KEY is missing in .env file!")
-
-# Initialize Gemini
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
-
-def analyze_transactions(transactions: List[Transaction], initial_balance: float) -> Dict:
-    print(" Starting transaction analysis...")
-
-    # Prepare transaction data
-    transaction_data = {
-        "initial_balance": initial_balance,
-        "transactions": [
-            {
-                "amount": t.amount,
-                "type": t.transaction_type.value,
-                "category": t.category.name,
-                "description": t.description,
-                "date": t.created_at.isoformat() if t.created_at else None
-            }
-            for t in transactions
-        ]
-    }
+# The three section prompts run side by side on this pool; each call is
+# given INSIGHTS_LLM_TIMEOUT seconds before its section is reported as failed.
+INSIGHTS_LLM_WORKERS = int(os.getenv("INSIGHTS_LLM_WORKERS", "12"))
+INSIGHTS_LLM_TIMEOUT = float(os.getenv("INSIGHTS_LLM_TIMEOUT", "30"))
+llm_executor = ThreadPoolExecutor(max_workers=INSIGHTS_LLM_WORKERS, thread_name_prefix="insights-llm")
+
+# Insights generations allowed to run at once, overall and per user; a
+# request waits up to INSIGHTS_LIMIT_WAIT seconds for a slot before getting a 503.
+INSIGHTS_MAX_CONCURRENT = int(os.getenv("INSIGHTS_MAX_CONCURRENT", str(max(1, INSIGHTS_LLM_WORKERS // 3))))
+INSIGHTS_MAX_CONCURRENT_PER_USER = int(os.getenv("INSIGHTS_MAX_CONCURRENT_PER_USER", "1"))
+INSIGHTS_LIMIT_WAIT = float(os.getenv("INSIGHTS_LIMIT_WAIT", "10"))
+llm_limiter = ConcurrencyLimiter(INSIGHTS_MAX_CONCURRENT, INSIGHTS_MAX_CONCURRENT_PER_USER, INSIGHTS_LIMIT_WAIT)
+
+# Concurrent requests for the same user and data share one generation,
+# keyed by (user_id, data fingerprint); duplicates wait up to this long for it.
+INSIGHTS_COALESCE_WAIT = INSIGHTS_LLM_TIMEOUT + INSIGHTS_LIMIT_WAIT + 30
+insights_flights = SingleFlight()
+
+
+class InsightsBusy(Exception):
+    """No generation slot freed up in time, or the shared generation was abandoned."""
+
+    def __init__(self, message: str = "Too many insights requests in progress. Please try again shortly."):
+        super().__init__(message)
+
+# "separate" sends one prompt per section; "consolidated" sends a single
+# compact prompt for all three, trimmed to roughly INSIGHTS_PROMPT_TOKEN_BUDGET tokens.
+INSIGHTS_PROMPT_MODE = os.getenv("INSIGHTS_PROMPT_MODE", "separate")
+INSIGHTS_PROMPT_TOKEN_BUDGET = int(os.getenv("INSIGHTS_PROMPT_TOKEN_BUDGET", "1500"))
+# Expense categories listed individually in the compact prompt; the rest are summed as "Other"
+INSIGHTS_PROMPT_MAX_CATEGORIES = 8
 
-    # Compute financial metrics
-    total_income = sum(t.amount for t in transactions if t.transaction_type.value == 'income')
-    total_expenses = sum(t.amount for t in transactions if t.transaction_type.value == 'expense')
-    current_balance = initial_balance + total_income - total_expenses
-
-    # Expenses grouped by category
-    expense_by_category = {}
-    for t in transactions:
-        if t.transaction_type.value == 'expense':
-            cat = t.category.name
-            expense_by_category[cat] = expense_by_category.get(cat, 0) + t.amount
-
-    # Monthly financial trends
-    monthly_data = {}
-    for t in transactions:
-        if t.created_at:
-            month_key = t.created_at.strftime("%Y-%m")
-            monthly_data.setdefault(month_key, {"income": 0, "expenses": 0})
-            if t.transaction_type.value == 'income':
-                monthly_data[month_key]["income"] += t.amount
-            else:
-                monthly_data[month_key]["expenses"] += t.amount
-
-    # Format amounts in Indian Rupees
-    def format_inr(amount: float) -> str:
-        return f"₹{amount:,.2f}"
+# Expected top-level keys and value types of each insights section
+SECTION_SCHEMAS = {
+    "income_insights": {"analysis": str, "recommendations": list, "opportunities": list},
+    "expense_insights": {"analysis": str, "optimization": list, "savings_opportunities": list},
+    "investment_insights": {"strategy": str, "recommendations": list, "allocation": dict},
+}
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting and comparisons
+    return len(text) // 4 + 1
+
+# Format amounts in Indian Rupees
+def format_inr(amount: float) -> str:
+    return f"₹{amount:,.2f}"
+
+def build_prompts(metrics: Dict) -> Dict[str, str]:
+    """Prompt per insights section, keyed by the section's name in the response."""
+    total_income = metrics["total_income"]
+    total_expenses = metrics["total_expenses"]
+    current_balance = metrics["current_balance"]
+    expense_by_category = metrics["expense_by_category"]
+    monthly_data = metrics["monthly_trends"]
+    advanced = advanced_summary(metrics.get("advanced"))
 
     # Income Analysis Prompt
     income_prompt = f"""As a financial advisor, analyze this data and provide insights:
@@ -88,6 +100,7 @@ def analyze_transactions(transactions: List[Transaction], initial_balance: float
     - Total Expenses: {format_inr(total_expenses)}
     - Expenses By Category: {json.dumps(expense_by_category, indent=2)}
     - Monthly Trends: {json.dumps(monthly_data, indent=2)}
+    - Trends, Month-over-Month Changes and Unusual Expenses: {json.dumps(advanced, indent=2, ensure_ascii=False)}
     
     Provide detailed spending analysis, identify patterns, and suggest optimization strategies.
     Format your response strictly as a JSON with this structure:
@@ -102,6 +115,8 @@ def analyze_transactions(transactions: List[Transaction], initial_balance: float
     - Monthly Income: {format_inr(total_income)}
     - Monthly Expenses: {format_inr(total_expenses)}
     - Savings Rate: {((total_income - total_expenses) / total_income * 100) if total_income > 0 else 0}%
+    - Recent Savings Rates (%): {advanced.get("savings_rate_pct_recent", [])}
+    - Next Month Forecast: {json.dumps(advanced.get("forecast_next_month", {}))}
     
     Provide detailed investment strategy considering risk tolerance and market conditions.
     Format your response strictly as a JSON with this structure:
@@ -110,45 +125,306 @@ def analyze_transactions(transactions: List[Transaction], initial_balance: float
     Return only valid JSON. Do not include markdown, backticks, or explanation!!!
     """
 
+    return {
+        "income_insights": income_prompt,
+        "expense_insights": expense_prompt,
+        "investment_insights": investment_prompt,
+    }
+
+def compact_metrics(metrics: Dict, token_budget: int) -> str:
+    """Metrics as minified JSON, dropping the oldest months until it fits token_budget."""
+    total_income = metrics["total_income"]
+    total_expenses = metrics["total_expenses"]
+
+    categories = sorted(metrics["expense_by_category"].items(), key=lambda item: item[1], reverse=True)
+    by_category = {name: round(amount, 2) for name, amount in categories[:INSIGHTS_PROMPT_MAX_CATEGORIES]}
+    other = sum(amount for _, amount in categories[INSIGHTS_PROMPT_MAX_CATEGORIES:])
+    if other:
+        by_category["Other"] = round(other, 2)
+
+    # month -> [income, expenses]
+    months = [
+        (month, [round(values["income"], 2), round(values["expenses"], 2)])
+        for month, values in sorted(metrics["monthly_trends"].items())
+    ]
+
+    payload = {
+        "income": round(total_income, 2),
+        "expenses": round(total_expenses, 2),
+        "balance": round(metrics["current_balance"], 2),
+        "savings_rate_pct": round((total_income - total_expenses) / total_income * 100, 1) if total_income > 0 else 0,
+        "expenses_by_category": by_category,
+        "monthly_income_expenses": dict(months),
+    }
+    advanced = advanced_summary(metrics.get("advanced"))
+    if advanced:
+        payload["trends"] = advanced
+    encoded = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    while estimate_tokens(encoded) > token_budget and len(months) > 1:
+        # Drop the oldest ~10% at a time so long histories converge quickly
+        months = months[max(1, len(months) // 10):]
+        payload["monthly_income_expenses"] = dict(months)
+        payload["months_omitted"] = len(metrics["monthly_trends"]) - len(months)
+        encoded = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return encoded
+
+def build_consolidated_prompt(metrics: Dict, token_budget: int = INSIGHTS_PROMPT_TOKEN_BUDGET) -> str:
+    """One prompt covering all three sections, with compactly encoded metrics."""
+    structure = json.dumps({
+        "income_insights": {"analysis": "...", "recommendations": ["..."], "opportunities": ["..."]},
+        "expense_insights": {"analysis": "...", "optimization": ["..."], "savings_opportunities": ["..."]},
+        "investment_insights": {"strategy": "...", "recommendations": ["..."], "allocation": {"stocks": "percent", "bonds": "percent", "cash": "percent"}},
+    }, separators=(",", ":"))
+    return (
+        "As a financial advisor, analyze this user's finances (amounts in INR). "
+        "Cover income patterns and growth opportunities, spending patterns and savings, "
+        "and an investment strategy with an asset allocation.\n"
+        f"Data: {compact_metrics(metrics, token_budget)}\n"
+        f"Format your response strictly as a JSON with this structure:\n{structure}\n"
+        "Return only valid JSON. Do not include markdown, backticks, or explanation."
+    )
+
+def validate_section(name: str, section) -> Dict:
+    if not isinstance(section, dict):
+        raise ValueError(f"Missing or malformed {name}")
+    for key, expected_type in SECTION_SCHEMAS[name].items():
+        if not isinstance(section.get(key), expected_type):
+            raise ValueError(f"{name}.{key} should be of type {expected_type.__name__}")
+    return section
+
+def call_llm(section: str, prompt: str) -> str:
+    start = time.perf_counter()
+    text = None
     try:
-        # Generate AI responses
-        income_response = model.generate_content(income_prompt)
-        expense_response = model.generate_content(expense_prompt)
-        investment_response = model.generate_content(investment_prompt)
-        
-        print("Income Response Text:\n", income_response.text)
-        print("Expense Response Text:\n", expense_response.text)
-        print("Investment Response Text:\n", investment_response.text)
-
-        # Parse JSON responses
-        income_insights = json.loads(extract_json(income_response.text))
-        expense_insights = json.loads(extract_json(expense_response.text))
-        investment_insights = json.loads(extract_json(investment_response.text))
-
-        # Combine all insights
-        return {
-            "income_insights": income_insights,
-            "expense_insights": expense_insights,
-            "investment_insights": investment_insights,
-            "metrics": {
-                "total_income": total_income,
-                "total_expenses": total_expenses,
-                "current_balance": current_balance,
-                "expense_by_category": expense_by_category,
-                "monthly_trends": monthly_data
-            }
+        text = get_provider().generate(prompt, timeout=INSIGHTS_LLM_TIMEOUT)
+    except Exception:
+        count_llm_error(section, "error")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        record_llm_call(elapsed)
+        observe_llm_call(section, elapsed, prompt, text)
+    logger.debug("LLM response", extra={"section": section, "response_chars": len(text), "response": text})
+    return text
+
+def parse_response(section: str, text: str) -> Dict:
+    try:
+        return json.loads(extract_json(text))
+    except ValueError:
+        count_llm_error(section, "invalid")
+        raise
+
+def generate_consolidated(prompt: str) -> Dict:
+    return parse_response("consolidated", call_llm("consolidated", prompt))
+
+def generate_section(name: str, prompt: str) -> Dict:
+    # Provider is chosen by LLM_PROVIDER (Gemini by default), see app.ai.providers
+    return parse_response(name, call_llm(name, prompt))
+
+def iter_sections(metrics: Dict, mode: Optional[str] = None) -> Iterator[Tuple[str, Optional[Dict], Optional[str]]]:
+    """Yield (section name, section, error) for each section as soon as it is ready.
+
+    In "separate" mode the section prompts run concurrently and are
+    yielded in completion order; in "consolidated" mode one request
+    returns all of them and each is validated against SECTION_SCHEMAS.
+    Every section is yielded exactly once, with an error if it failed or
+    did not finish within INSIGHTS_LLM_TIMEOUT.
+    """
+    mode = mode or INSIGHTS_PROMPT_MODE
+    logger.info("Starting transaction analysis", extra={"mode": mode})
+
+    # future -> section name, or None for the consolidated request. Calls run
+    # in the caller's context so LLM time lands on the request's profile.
+    if mode == "consolidated":
+        futures = {llm_executor.submit(copy_context().run, generate_consolidated, build_consolidated_prompt(metrics)): None}
+    else:
+        futures = {
+            llm_executor.submit(copy_context().run, generate_section, name, prompt): name
+            for name, prompt in build_prompts(metrics).items()
         }
 
-    except Exception as e:
-        print(f" Error generating insights: {str(e)}")
+    pending = set(SECTION_SCHEMAS)
+    try:
+        for future in as_completed(futures, timeout=INSIGHTS_LLM_TIMEOUT):
+            name = futures[future]
+            names = [name] if name else list(SECTION_SCHEMAS)
+            pending.difference_update(names)
+            try:
+                result = future.result()
+            except Exception as e:
+                for section_name in names:
+                    yield section_name, None, str(e)
+                continue
+
+            if name:
+                yield name, result, None
+                continue
+            # Fan the single consolidated response out to the individual sections
+            for section_name in names:
+                try:
+                    yield section_name, validate_section(section_name, result.get(section_name) if isinstance(result, dict) else None), None
+                except ValueError as e:
+                    count_llm_error(section_name, "invalid")
+                    yield section_name, None, str(e)
+    except FuturesTimeoutError:
+        for future in futures:
+            future.cancel()
+        for name in [name for name in SECTION_SCHEMAS if name in pending]:
+            count_llm_error(name, "timeout")
+            yield name, None, f"Timed out after {INSIGHTS_LLM_TIMEOUT:g}s"
+
+def assemble_insights(metrics: Dict, sections: Dict[str, Optional[Dict]], errors: Dict[str, str]) -> Dict:
+    """Build the /transactions/insights response.
+
+    A failed section is returned as None and its error listed under
+    "errors"; the response only degrades to the "error" shape when every
+    section failed.
+    """
+    if len(errors) == len(SECTION_SCHEMAS):
+        logger.warning("Insights generation failed", extra={"errors": errors})
         return {
             "error": "Failed to generate insights",
-            "message": str(e),
-            "metrics": {
-                "total_income": total_income,
-                "total_expenses": total_expenses,
-                "current_balance": current_balance,
-                "expense_by_category": expense_by_category,
-                "monthly_trends": monthly_data
-            }
+            "message": "; ".join(f"{name}: {error}" for name, error in errors.items()),
+            "metrics": metrics
         }
+
+    insights = {**{name: sections.get(name) for name in SECTION_SCHEMAS}, "metrics": metrics}
+    if errors:
+        logger.warning("Partial insights", extra={"errors": errors})
+        insights["errors"] = errors
+    return insights
+
+def analyze_transactions(metrics: Dict, mode: Optional[str] = None) -> Dict:
+    """Generate LLM insights from the metrics computed by app.ai.metrics.compute_metrics."""
+    sections = {}
+    errors = {}
+    for name, section, error in iter_sections(metrics, mode):
+        if error is None:
+            sections[name] = section
+        else:
+            errors[name] = error
+    return assemble_insights(metrics, sections, errors)
+
+def _acquire_llm_slot(user_id: UUID):
+    if not llm_limiter.acquire(user_id):
+        raise InsightsBusy()
+
+def _finish_generation(user_id: UUID, fingerprint: Tuple, insights: Dict) -> Dict:
+    # Failed or partial generations are retried on the next request rather than cached
+    if "error" not in insights and "errors" not in insights:
+        store_insights(user_id, fingerprint, insights)
+    return insights
+
+def _generate_insights(db: Session, user_id: UUID, fingerprint: Tuple) -> Dict:
+    metrics = compute_metrics(db, user_id, fingerprint[1])
+    _acquire_llm_slot(user_id)
+    try:
+        insights = analyze_transactions(metrics)
+    finally:
+        llm_limiter.release(user_id)
+    return _finish_generation(user_id, fingerprint, insights)
+
+def get_user_insights(db: Session, user_id: UUID, fingerprint: Optional[Tuple] = None) -> Dict:
+    """Insights for a user, served from the cache while their data is unchanged.
+
+    fingerprint is data_fingerprint() if the caller already read it.
+    Raises InsightsBusy when no generation slot frees up in time.
+    """
+    fingerprint = fingerprint or data_fingerprint(db, user_id)
+    cached = get_cached_insights(user_id, fingerprint)
+    if cached is not None:
+        logger.debug("Insights cache hit", extra={"user_id": str(user_id)})
+        return cached
+
+    try:
+        return insights_flights.do(
+            (user_id, fingerprint),
+            lambda: _generate_insights(db, user_id, fingerprint),
+            timeout=INSIGHTS_COALESCE_WAIT,
+        )
+    except FuturesTimeoutError:
+        raise InsightsBusy()
+
+def stream_user_insights(db: Session, user_id: UUID) -> Iterator[Tuple[str, Dict]]:
+    """Insights as (event, data) pairs: metrics first, then each section as it completes.
+
+    The database work happens before this returns, so the iterator can be
+    consumed after the request's session has been closed.
+    """
+    fingerprint = data_fingerprint(db, user_id)
+    cached = get_cached_insights(user_id, fingerprint)
+    if cached is not None:
+        return _replay_events(cached)
+
+    key = (user_id, fingerprint)
+    flight = insights_flights.join(key)
+    if flight is not None:
+        # Already being generated for another request: wait for that instead of scanning the history again
+        return _follower_events(flight)
+    metrics = compute_metrics(db, user_id, fingerprint[1])
+    return _insights_events(key, metrics)
+
+def _replay_events(insights: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Events for an already generated (cached or shared) insights response."""
+    yield "metrics", insights["metrics"]
+    if "error" in insights:
+        errors = {name: insights["message"] for name in SECTION_SCHEMAS}
+    else:
+        errors = insights.get("errors", {})
+    for name in SECTION_SCHEMAS:
+        if name in errors:
+            yield "section_error", {"name": name, "error": errors[name]}
+        else:
+            yield "section", {"name": name, "data": insights[name]}
+    yield "done", {"errors": errors}
+
+def _follower_events(flight) -> Iterator[Tuple[str, Dict]]:
+    try:
+        insights = flight.result(timeout=INSIGHTS_COALESCE_WAIT)
+    except Exception as e:
+        error = str(InsightsBusy()) if isinstance(e, FuturesTimeoutError) else str(e)
+        for name in SECTION_SCHEMAS:
+            yield "section_error", {"name": name, "error": error}
+        yield "done", {"errors": {name: error for name in SECTION_SCHEMAS}}
+        return
+    yield from _replay_events(insights)
+
+def _insights_events(key: Tuple, metrics: Dict) -> Iterator[Tuple[str, Dict]]:
+    user_id, fingerprint = key
+    flight, leader = insights_flights.lead(key)
+    if not leader:
+        # Another request started generating between our metrics query and now
+        yield from _follower_events(flight)
+        return
+
+    insights = None
+    try:
+        yield "metrics", metrics
+        sections = {}
+        errors = {}
+        try:
+            _acquire_llm_slot(user_id)
+        except InsightsBusy as e:
+            errors = {name: str(e) for name in SECTION_SCHEMAS}
+            for name in SECTION_SCHEMAS:
+                yield "section_error", {"name": name, "error": errors[name]}
+        else:
+            try:
+                for name, section, error in iter_sections(metrics):
+                    if error is None:
+                        sections[name] = section
+                        yield "section", {"name": name, "data": section}
+                    else:
+                        errors[name] = error
+                        yield "section_error", {"name": name, "error": error}
+            finally:
+                llm_limiter.release(user_id)
+
+        insights = _finish_generation(user_id, fingerprint, assemble_insights(metrics, sections, errors))
+        yield "done", {"errors": errors}
+    finally:
+        if insights is None:
+            # The client went away mid-stream; requests waiting on us should retry
+            insights_flights.land(key, flight, error=InsightsBusy("Insights generation was interrupted. Please try again."))
+        else:
+            insights_flights.land(key, flight, insights)
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from uuid import UUID, uuid4
+from app.ai.insights import get_user_insights
+from app.db.database import SessionLocal
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+INSIGHTS_JOB_WORKERS = int(os.getenv("INSIGHTS_JOB_WORKERS", "4"))
+INSIGHTS_JOB_QUEUE_DEPTH = int(os.getenv("INSIGHTS_JOB_QUEUE_DEPTH", "32"))
+# How long finished jobs can still be polled
+INSIGHTS_JOB_RESULT_TTL = float(os.getenv("INSIGHTS_JOB_RESULT_TTL", "900"))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class InsightsJob:
+    user_id: UUID
+    # The data the job was requested for, from data_fingerprint()
+    fingerprint: Tuple
+    id: UUID = field(default_factory=uuid4)
+    status: str = "queued"  # queued -> running -> succeeded | failed
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+
+
+class InsightsJobManager:
+    """Runs insights generation off the request path on a bounded pool.
+
+    At most workers + queue_depth jobs are admitted at once; past that,
+    submit() raises JobQueueFull so callers can shed load instead of
+    piling work onto the shared request threadpool.
+    """
+
+    def __init__(self, workers: int, queue_depth: int, result_ttl: float):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="insights-job")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._jobs = TTLCache(maxsize=10_000, ttl=result_ttl)
+        self._active: Dict[Tuple[UUID, Tuple], InsightsJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: UUID, fingerprint: Tuple) -> InsightsJob:
+        key = (user_id, fingerprint)
+        with self._lock:
+            # A user polling for a result doesn't need a second job for the same
+            # data; once their data or balance changes they get a fresh one
+            active = self._active.get(key)
+            if active is not None:
+                return active
+            if not self._slots.acquire(blocking=False):
+                raise JobQueueFull()
+            job = InsightsJob(user_id=user_id, fingerprint=fingerprint)
+            self._active[key] = job
+            self._jobs.set(job.id, job)
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: UUID) -> Optional[InsightsJob]:
+        return self._jobs.get(job_id)
+
+    def _run(self, job: InsightsJob):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            # Re-read rather than job.fingerprint: the result must be cached
+            # under the data it was actually computed from
+            job.result = get_user_insights(db, job.user_id)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception("Insights job failed", extra={"job_id": str(job.id)})
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            db.close()
+            job.finished_at = datetime.utcnow()
+            # Restart the retention clock now that the result is available
+            self._jobs.set(job.id, job)
+            with self._lock:
+                self._active.pop((job.user_id, job.fingerprint), None)
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = InsightsJobManager(INSIGHTS_JOB_WORKERS, INSIGHTS_JOB_QUEUE_DEPTH, INSIGHTS_JOB_RESULT_TTL)
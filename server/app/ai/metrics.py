@@ -0,0 +1,61 @@
+import os
+from typing import Dict
+from uuid import UUID
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.db.model import MonthlyRollup, Category, TransactionType
+from app.ai.analytics import analyze_history, load_recent_expenses, monthly_totals
+
+# Adds metrics["advanced"]: series from the same rollup rows, plus anomalies
+# from a bounded window of recent expenses
+ADVANCED_METRICS_ENABLED = os.getenv("ADVANCED_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def compute_metrics(db: Session, user_id: UUID, initial_balance: float) -> Dict:
+    """Financial metrics for a user, read from the monthly rollup table.
+
+    The rollup already holds one row per (month, category, type), so this
+    reads O(months x categories) rows however long the history is, and
+    folds them into the same structure the insights endpoint has always
+    returned.
+    """
+    statement = (
+        select(
+            MonthlyRollup.transaction_type,
+            Category.name,
+            MonthlyRollup.month,
+            func.sum(MonthlyRollup.total).label("total"),
+        )
+        .join(Category, MonthlyRollup.category_id == Category.id)
+        .where(MonthlyRollup.user_id == user_id, MonthlyRollup.count > 0)
+        .group_by(MonthlyRollup.transaction_type, Category.name, MonthlyRollup.month)
+        .order_by(MonthlyRollup.month)
+    )
+
+    total_income = 0
+    total_expenses = 0
+    expense_by_category = {}
+    monthly_data = {}
+    rows = db.execute(statement).all()
+    for row in rows:
+        monthly_data.setdefault(row.month, {"income": 0, "expenses": 0})
+        if row.transaction_type == TransactionType.INCOME:
+            total_income += row.total
+            monthly_data[row.month]["income"] += row.total
+        else:
+            total_expenses += row.total
+            monthly_data[row.month]["expenses"] += row.total
+            expense_by_category[row.name] = expense_by_category.get(row.name, 0) + row.total
+
+    metrics = {
+        "total_income": total_income,
+        "total_expenses": total_expenses,
+        "current_balance": initial_balance + total_income - total_expenses,
+        "expense_by_category": expense_by_category,
+        "monthly_trends": monthly_data,
+    }
+    if ADVANCED_METRICS_ENABLED:
+        metrics["advanced"] = analyze_history(
+            monthly_totals(rows), load_recent_expenses(db, user_id), metrics["current_balance"]
+        )
+    return metrics
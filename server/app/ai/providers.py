@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class LLMProvider(ABC):
+    """Text-in, text-out interface the insights pipeline calls through."""
+
+    name = "base"
+
+    @abstractmethod
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        ...
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], model_name: str = "gemini-2.0-flash"):
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY is missing in .env file")
+        # Imported here so the app can start (and be tested) without the SDK configured
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        request_options = {"timeout": timeout} if timeout else None
+        return self.model.generate_content(prompt, request_options=request_options).text
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline backend for tests and load tests.
+
+    Answers with the example JSON object each prompt asks for, after a
+    configurable latency. The jitter is derived from the prompt hash, so
+    the same prompt always takes the same time.
+    """
+
+    name = "fake"
+    STRUCTURE_PATTERN = re.compile(r"structure:\s*(\{.*\})\s*$", re.MULTILINE)
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        delay = self.latency + self.jitter * (digest[0] / 255)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake LLM call exceeded {timeout:g}s")
+        time.sleep(delay)
+
+        match = self.STRUCTURE_PATTERN.search(prompt)
+        return match.group(1) if match else "{}"
+
+
+class RecordReplayProvider(LLMProvider):
+    """Saves prompt/response pairs to disk, or serves them back.
+
+    In "record" mode every call goes to the wrapped provider and is
+    written to <directory>/<sha256 of prompt>.json. In "replay" mode the
+    wrapped provider is never called; a prompt that was not recorded
+    raises LookupError. With replay_latency the recorded call duration is
+    reproduced, which keeps load-test timings realistic offline; a
+    recording slower than the timeout raises TimeoutError either way.
+    """
+
+    name = "record-replay"
+
+    def __init__(self, directory: str, mode: str, inner: Optional[LLMProvider] = None, replay_latency: bool = True):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode needs a provider to record from")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.inner = inner
+        self.replay_latency = replay_latency
+
+    def _path(self, prompt: str) -> Path:
+        return self.directory / f"{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}.json"
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        path = self._path(prompt)
+        if self.mode == "replay":
+            if not path.exists():
+                raise LookupError(f"No recorded response for prompt {path.stem}")
+            recording = json.loads(path.read_text(encoding="utf-8"))
+            # A recording slower than the timeout fails as the live call would
+            if timeout is not None and recording["latency"] > timeout:
+                if self.replay_latency:
+                    time.sleep(timeout)
+                raise TimeoutError(f"Recorded LLM call took {recording['latency']:.2f}s, over {timeout:g}s")
+            if self.replay_latency:
+                time.sleep(recording["latency"])
+            return recording["response"]
+
+        start = time.perf_counter()
+        response = self.inner.generate(prompt, timeout=timeout)
+        recording = {"prompt": prompt, "response": response, "latency": time.perf_counter() - start}
+        path.write_text(json.dumps(recording, ensure_ascii=False, indent=2), encoding="utf-8")
+        return response
+
+
+def create_provider() -> LLMProvider:
+    """Build the provider described by the environment.
+
+    LLM_PROVIDER         gemini (default) | fake
+    FAKE_LLM_LATENCY_MS  base latency of the fake provider
+    FAKE_LLM_JITTER_MS   extra, prompt-dependent latency of the fake provider
+    LLM_RECORD_DIR       enables record/replay, storing recordings here
+    LLM_RECORD_MODE      record (default) | replay
+    """
+    kind = os.getenv("LLM_PROVIDER", "gemini").lower()
+    record_dir = os.getenv("LLM_RECORD_DIR")
+    record_mode = os.getenv("LLM_RECORD_MODE", "record").lower()
+
+    if record_dir and record_mode == "replay":
+        return RecordReplayProvider(record_dir, "replay")
+
+    if kind == "fake":
+        provider = FakeProvider(
+            latency=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")) / 1000,
+            jitter=float(os.getenv("FAKE_LLM_JITTER_MS", "0")) / 1000,
+        )
+    elif kind == "gemini":
+        provider = GeminiProvider(os.getenv("GEMINI_API_KEY"), os.getenv("GEMINI_MODEL", "gemini-2.0-flash"))
+    else:
+        raise ValueError(f"Unknown LLM_PROVIDER: {kind}")
+
+    if record_dir:
+        return RecordReplayProvider(record_dir, "record", inner=provider)
+    return provider
+
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """Process-wide provider, created on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_provider()
+    return _provider
+
+
+def set_provider(provider: Optional[LLMProvider]):
+    """Swap the provider (benchmarks, tests); None re-reads the environment on next use."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -1,13 +1,90 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 import bcrypt
 
+# bcrypt work factor for new hashes; existing hashes with a different cost
+# are upgraded transparently on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Password hashing runs on its own pool so a login burst can't occupy every
+# request thread. At most workers + queue depth operations are admitted.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "64"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when the hashing pool is saturated."""
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    # Module-level so it can be pickled into a process pool
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+_executor: Executor = None
+_slots: threading.BoundedSemaphore = None
+
+
+def configure_password_executor(workers: int, queue_depth: int, kind: str = "thread"):
+    """(Re)create the hashing pool; used at import time and by benchmarks."""
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    if kind == "process":
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    _slots = threading.BoundedSemaphore(workers + queue_depth)
+
+
+configure_password_executor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_DEPTH, PASSWORD_HASH_EXECUTOR)
+
+
+def _submit(fn, *args) -> Future:
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
 def hash_password(password: str) -> str:
-    # Convert the password to bytes
-    password_bytes = password.encode('utf-8')
-    # Generate a salt and hash the password
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    # Convert the password to bytes, hash it with a fresh salt on the pool
+    hashed = _submit(_hashpw, password.encode('utf-8'), BCRYPT_ROUNDS).result()
     # Return the hash as a string
     return hashed.decode('utf-8')
 
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
\ No newline at end of file
+    return _submit(_checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8')).result()
+
+
+async def hash_password_async(password: str) -> str:
+    hashed = await asyncio.wrap_future(_submit(_hashpw, password.encode('utf-8'), BCRYPT_ROUNDS))
+    return hashed.decode('utf-8')
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(
+        _submit(_checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    )
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
@@ -1,9 +1,18 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from uuid import UUID
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 import os
+import time
 from dotenv import load_dotenv
+from app.db.database import get_async_db, get_db
+from app.db.model import User
+from app.utils.cache import TTLCache
 
 load_dotenv()
 
@@ -13,6 +22,27 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 45
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Verified token -> claims, so a repeat request skips the signature check.
+# Entries never outlive the token's own expiry.
+token_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+# username -> Principal. Short TTL bounds staleness across workers; writes
+# to the user row in this process call invalidate_principal().
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL", "60")),
+)
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, as needed by request handlers."""
+    id: UUID
+    username: str
+    email: str
+    full_name: str
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -37,3 +67,70 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     return verify_token(token, credentials_exception)
+
+def _verified_claims(token: str, credentials_exception) -> dict:
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    if claims.get("sub") is None:
+        raise credentials_exception
+    token_cache.set(token, claims, ttl=max(0, claims.get("exp", 0) - time.time()))
+    return claims
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _principal_query(claims: dict) -> Select:
+    # Tokens issued since the "uid" claim was added resolve by primary key
+    query = select(User.id, User.username, User.email, User.full_name)
+    if claims.get("uid"):
+        return query.where(User.id == UUID(claims["uid"]))
+    return query.where(User.username == claims["sub"])
+
+def _cache_principal(username: str, user) -> Principal:
+    if not user or user.username != username:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    principal = Principal(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+    )
+    principal_cache.set(username, principal)
+    return principal
+
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    claims = _verified_claims(token, _credentials_exception())
+    username = claims["sub"]
+
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    return _cache_principal(username, db.execute(_principal_query(claims)).first())
+
+async def get_current_principal_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """get_current_principal for async routes: no threadpool hop, and a cache miss doesn't block the event loop."""
+    claims = _verified_claims(token, _credentials_exception())
+    username = claims["sub"]
+
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    return _cache_principal(username, (await db.execute(_principal_query(claims))).first())
+
+def invalidate_principal(username: str):
+    principal_cache.pop(username)
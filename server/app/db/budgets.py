@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Dict, List
+from uuid import UUID
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from app.db.catalog import category_catalog
+from app.db.model import Budget, MonthlyRollup, TransactionType
+from app.db.rollup import month_key
+
+
+def budget_state(spent: float, amount: float, alert_threshold_pct: int) -> str:
+    if spent >= amount:
+        return "exceeded"
+    if spent >= amount * alert_threshold_pct / 100:
+        return "warning"
+    return "ok"
+
+
+def _month_to_date(month: str):
+    # The rollup counter for a budget's category in one month, if there is one yet
+    return and_(
+        MonthlyRollup.user_id == Budget.user_id,
+        MonthlyRollup.category_id == Budget.category_id,
+        MonthlyRollup.month == month,
+        MonthlyRollup.transaction_type == TransactionType.EXPENSE,
+    )
+
+
+def check_budget(db: Session, user_id: UUID, category_id: UUID, created_at: datetime, amount: float) -> List[Dict]:
+    """Alerts for thresholds this expense pushed its category across.
+
+    Call after apply_to_rollup in the same DB transaction: the month-to-date
+    total then already includes the expense. One primary key lookup on
+    budgets and one on monthly_rollups, however long the history.
+    """
+    month = month_key(created_at)
+    row = db.execute(
+        select(Budget.amount, Budget.alert_threshold_pct, MonthlyRollup.total)
+        .outerjoin(MonthlyRollup, _month_to_date(month))
+        .where(Budget.user_id == user_id, Budget.category_id == category_id)
+    ).first()
+    if row is None:
+        return []
+
+    spent = row.total or 0.0
+    before = budget_state(spent - amount, row.amount, row.alert_threshold_pct)
+    after = budget_state(spent, row.amount, row.alert_threshold_pct)
+    if after == before or after == "ok":
+        return []
+    category = category_catalog.get(category_id)
+    return [{
+        "category_id": category_id,
+        "category": category.name if category else str(category_id),
+        "month": month,
+        "level": after,
+        "budget": row.amount,
+        "spent": round(spent, 2),
+        "alert_threshold_pct": row.alert_threshold_pct,
+    }]
+
+
+def budget_status(db: Session, user_id: UUID, month: str) -> List[Dict]:
+    """Every budget of the user against its month-to-date spending, from the rollup counters."""
+    rows = db.execute(
+        select(Budget.category_id, Budget.amount, Budget.alert_threshold_pct, MonthlyRollup.total)
+        .outerjoin(MonthlyRollup, _month_to_date(month))
+        .where(Budget.user_id == user_id)
+    ).all()
+
+    statuses = []
+    for row in rows:
+        spent = row.total or 0.0
+        category = category_catalog.get(row.category_id)
+        statuses.append({
+            "category_id": row.category_id,
+            "category": category.name if category else str(row.category_id),
+            "budget": row.amount,
+            "spent": round(spent, 2),
+            "remaining": round(row.amount - spent, 2),
+            "percent_used": round(spent / row.amount * 100, 1),
+            "alert_threshold_pct": row.alert_threshold_pct,
+            "state": budget_state(spent, row.amount, row.alert_threshold_pct),
+        })
+    statuses.sort(key=lambda status: status["percent_used"], reverse=True)
+    return statuses
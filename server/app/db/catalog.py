@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from uuid import UUID
+from app.db.database import SessionLocal
+from app.db.model import Category
+
+# Categories are seeded once and rarely change; other processes' changes are
+# picked up after this many seconds, or sooner when an unknown id shows up.
+CATEGORY_CATALOG_TTL = float(os.getenv("CATEGORY_CATALOG_TTL", "300"))
+# Minimum gap between reloads triggered by unknown ids, so bad input can't force a query per request
+MISS_REFRESH_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class CategoryEntry:
+    id: UUID
+    name: str
+
+
+class CategoryCatalog:
+    """In-memory copy of the categories table, versioned by a content hash."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_id: Dict[UUID, CategoryEntry] = {}
+        self._by_name: Dict[str, CategoryEntry] = {}
+        self._entries: List[CategoryEntry] = []
+        self.version: Optional[str] = None
+        self._loaded_at = 0.0
+
+    def refresh(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(Category.id, Category.name).order_by(Category.name).all()
+        finally:
+            db.close()
+
+        entries = [CategoryEntry(id=row.id, name=row.name) for row in rows]
+        digest = hashlib.sha1("\n".join(f"{e.id}:{e.name}" for e in entries).encode("utf-8")).hexdigest()
+        with self._lock:
+            self._entries = entries
+            self._by_id = {e.id: e for e in entries}
+            self._by_name = {e.name.lower(): e for e in entries}
+            self.version = digest[:16]
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self.version is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh()
+
+    def all(self) -> List[CategoryEntry]:
+        self._ensure_fresh()
+        return self._entries
+
+    def get(self, category_id: UUID) -> Optional[CategoryEntry]:
+        self._ensure_fresh()
+        entry = self._by_id.get(category_id)
+        if entry is None and time.monotonic() - self._loaded_at > MISS_REFRESH_INTERVAL:
+            # Possibly added since the last load (e.g. seeded by another process)
+            self.refresh()
+            entry = self._by_id.get(category_id)
+        return entry
+
+    def get_by_name(self, name: str) -> Optional[CategoryEntry]:
+        self._ensure_fresh()
+        return self._by_name.get(name.strip().lower())
+
+    def current_version(self) -> str:
+        self._ensure_fresh()
+        return self.version
+
+
+category_catalog = CategoryCatalog(CATEGORY_CATALOG_TTL)
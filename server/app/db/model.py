@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import UUID, Column, String, Float, ForeignKey, Enum, DateTime
+from sqlalchemy import UUID, Column, String, Float, Integer, ForeignKey, Enum, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from uuid import uuid4
@@ -16,6 +16,8 @@ class User(Base):
     password = Column(String, nullable=False)  # This should store hashed passwords only
     full_name = Column(String, nullable=False)
     initial_balance = Column(Float, nullable=True)  # Initial balance when user first starts
+    # Bumped by every write to the user's transactions or balance (see app.db.versions)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     transactions = relationship("Transaction", back_populates="user")
 
 class Category(Base):
@@ -40,4 +42,31 @@ class Transaction(Base):
     category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=False)
     category = relationship("Category", back_populates="transactions")
     description = Column(String)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Covers the per-user listing: filter on user_id, keyset order on (created_at, id)
+    __table_args__ = (
+        Index("ix_transactions_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+class MonthlyRollup(Base):
+    """Per-user monthly totals, maintained alongside every transaction write (see app.db.rollup)."""
+    __tablename__ = "monthly_rollups"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # "YYYY-MM"
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), primary_key=True)
+    transaction_type = Column(Enum(TransactionType), primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+class Budget(Base):
+    """A user's monthly spending limit for one category, checked against monthly_rollups."""
+    __tablename__ = "budgets"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), primary_key=True)
+    amount = Column(Float, nullable=False)
+    # Percent of amount at which a warning is raised, before the limit itself
+    alert_threshold_pct = Column(Integer, nullable=False, default=80)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
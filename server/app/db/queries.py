@@ -0,0 +1,81 @@
+import base64
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import Select, select, tuple_
+from app.db.model import Category, Transaction, TransactionType
+
+
+def encode_cursor(created_at: datetime, transaction_id: UUID) -> str:
+    """Opaque keyset cursor pointing at the last row of a page."""
+    raw = f"{created_at.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, transaction_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(transaction_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def transaction_filters(
+    user_id: UUID,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
+    category_id: Optional[UUID] = None,
+) -> List:
+    """SQL criteria for a user's transactions, usable with Query.filter and select().where."""
+    criteria = [Transaction.user_id == user_id]
+    if start_date is not None:
+        criteria.append(Transaction.created_at >= start_date)
+    if end_date is not None:
+        criteria.append(Transaction.created_at < end_date)
+    if transaction_type is not None:
+        criteria.append(Transaction.transaction_type == transaction_type)
+    if category_id is not None:
+        criteria.append(Transaction.category_id == category_id)
+    return criteria
+
+
+def transaction_list_query(criteria: list) -> Select:
+    """Just the columns of a TransactionResponse (plus created_at for the cursor), in one statement."""
+    return (
+        select(
+            Transaction.id,
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.category_id,
+            Category.name.label("category_name"),
+            Transaction.description,
+            Transaction.user_id,
+            Transaction.created_at,
+        )
+        .join(Category, Transaction.category_id == Category.id)
+        .where(*criteria)
+    )
+
+
+def transaction_row(row) -> Dict:
+    """A transaction_list_query row in the TransactionResponse shape, ready for JSON encoding."""
+    return {
+        "id": row.id,
+        "amount": row.amount,
+        "transaction_type": row.transaction_type.value,
+        "category_id": row.category_id,
+        "category": {"id": row.category_id, "name": row.category_name},
+        "description": row.description,
+        "user_id": row.user_id,
+    }
+
+
+def after_cursor(cursor: str):
+    """Keyset criterion for rows strictly after the cursor in (created_at DESC, id DESC) order."""
+    created_at, transaction_id = decode_cursor(cursor)
+    # A row-value comparison, so the planner can start the index scan at the
+    # cursor instead of filtering an OR across the whole user range
+    return tuple_(Transaction.created_at, Transaction.id) < tuple_(created_at, transaction_id)
@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import delete, extract, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.db.model import MonthlyRollup, Transaction, TransactionType, User
+
+RollupKey = Tuple[UUID, str, UUID, TransactionType]
+
+
+def month_key(created_at: datetime) -> str:
+    return created_at.strftime("%Y-%m")
+
+
+def apply_to_rollup(db: Session, rows: Iterable[Dict], sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) transactions from the monthly rollup.
+
+    rows are dicts with user_id, created_at, category_id, transaction_type and
+    amount. Nothing is committed here: call this inside the same DB
+    transaction as the write it mirrors so both land or neither does.
+    """
+    deltas: Dict[RollupKey, list] = {}
+    for row in rows:
+        key = (row["user_id"], month_key(row["created_at"]), row["category_id"], row["transaction_type"])
+        delta = deltas.setdefault(key, [0.0, 0])
+        delta[0] += sign * row["amount"]
+        delta[1] += sign
+
+    if deltas:
+        _upsert(db, deltas)
+
+
+def _upsert(db: Session, deltas: Dict[RollupKey, list]):
+    values = [
+        {
+            "user_id": user_id,
+            "month": month,
+            "category_id": category_id,
+            "transaction_type": transaction_type,
+            "total": total,
+            "count": count,
+        }
+        for (user_id, month, category_id, transaction_type), (total, count) in deltas.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = dialect_insert(MonthlyRollup).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "month", "category_id", "transaction_type"],
+            set_={
+                "total": MonthlyRollup.total + statement.excluded.total,
+                "count": MonthlyRollup.count + statement.excluded.count,
+            },
+        )
+        db.execute(statement)
+        return
+
+    # Portable fallback: increment in place, insert the keys that didn't exist yet
+    for value in values:
+        result = db.execute(
+            update(MonthlyRollup)
+            .where(
+                MonthlyRollup.user_id == value["user_id"],
+                MonthlyRollup.month == value["month"],
+                MonthlyRollup.category_id == value["category_id"],
+                MonthlyRollup.transaction_type == value["transaction_type"],
+            )
+            .values(total=MonthlyRollup.total + value["total"], count=MonthlyRollup.count + value["count"])
+        )
+        if result.rowcount == 0:
+            db.execute(insert(MonthlyRollup).values(**value))
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a "YYYY-MM" month."""
+    start = datetime.strptime(month, "%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def rollup_snapshot(
+    db: Session, user_ids: Optional[Sequence[UUID]] = None, month: Optional[str] = None
+) -> Dict[RollupKey, Tuple[float, int]]:
+    """Current rollup counters, keyed like apply_to_rollup's deltas."""
+    # Plain columns: ORM objects would come back stale from the identity map after a rebuild
+    statement = select(
+        MonthlyRollup.user_id, MonthlyRollup.month, MonthlyRollup.category_id,
+        MonthlyRollup.transaction_type, MonthlyRollup.total, MonthlyRollup.count,
+    )
+    if user_ids is not None:
+        statement = statement.where(MonthlyRollup.user_id.in_(user_ids))
+    if month is not None:
+        statement = statement.where(MonthlyRollup.month == month)
+    return {
+        (r.user_id, r.month, r.category_id, r.transaction_type): (r.total, r.count)
+        for r in db.execute(statement)
+    }
+
+
+def lock_users(db: Session, user_ids: Optional[Sequence[UUID]] = None):
+    """Hold off writes to these users' data (every user's if None) until the caller commits.
+
+    Every write path updates the users row (bump_data_version) before it
+    touches transactions or rollups, so it waits here rather than landing
+    between a rebuild's aggregate and its delete. SQLite has no row locks;
+    a no-op UPDATE takes its database write lock instead.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        statement = update(User).values(data_version=User.data_version)
+        if user_ids is not None:
+            statement = statement.where(User.id.in_(user_ids))
+        db.execute(statement)
+        return
+    statement = select(User.id).with_for_update()
+    if user_ids is not None:
+        statement = statement.where(User.id.in_(user_ids))
+    db.execute(statement).all()
+
+
+def rebuild_rollups(db: Session, user_ids: Optional[Sequence[UUID]] = None, month: Optional[str] = None) -> int:
+    """Recompute rollups from the raw transactions (backfill / drift repair).
+
+    Rebuilds the given users, otherwise every user, and only the given
+    "YYYY-MM" month when month is given. Returns the number of rollup rows
+    written. The caller commits.
+
+    The users are locked first, so it is safe to run against live traffic.
+    Users created after that lock are not covered, though, so pass
+    user_ids in batches (as app.scripts.rebuild_rollups does) rather than
+    None while the app is serving writes.
+    """
+    lock_users(db, user_ids)
+
+    year_of = extract("year", Transaction.created_at)
+    month_of = extract("month", Transaction.created_at)
+    statement = select(
+        Transaction.user_id,
+        year_of.label("year"),
+        month_of.label("month"),
+        Transaction.category_id,
+        Transaction.transaction_type,
+        func.sum(Transaction.amount).label("total"),
+        func.count().label("count"),
+    ).group_by(Transaction.user_id, year_of, month_of, Transaction.category_id, Transaction.transaction_type)
+
+    clear = delete(MonthlyRollup)
+    if user_ids is not None:
+        statement = statement.where(Transaction.user_id.in_(user_ids))
+        clear = clear.where(MonthlyRollup.user_id.in_(user_ids))
+    if month is not None:
+        # A created_at range, so the (user_id, created_at, id) index still applies
+        start, end = month_bounds(month)
+        statement = statement.where(Transaction.created_at >= start, Transaction.created_at < end)
+        clear = clear.where(MonthlyRollup.month == month)
+
+    values = [
+        {
+            "user_id": row.user_id,
+            "month": f"{int(row.year):04d}-{int(row.month):02d}",
+            "category_id": row.category_id,
+            "transaction_type": row.transaction_type,
+            "total": row.total,
+            "count": row.count,
+        }
+        for row in db.execute(statement)
+    ]
+
+    db.execute(clear)
+    if values:
+        db.execute(insert(MonthlyRollup), values)
+    return len(values)
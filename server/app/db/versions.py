@@ -0,0 +1,42 @@
+import hashlib
+from typing import Optional, Tuple
+from uuid import UUID
+from sqlalchemy import Select, select, update
+from sqlalchemy.orm import Session
+from app.db.model import User
+
+
+def bump_data_version(db: Session, user_id: UUID):
+    """Mark the user's data as changed.
+
+    Nothing is committed here: call it inside the same DB transaction as
+    the write, so readers never see new rows with an old version.
+    """
+    db.execute(update(User).where(User.id == user_id).values(data_version=User.data_version + 1))
+
+
+def data_version_query(user_id: UUID) -> Select:
+    # Primary key lookup on users; never touches the transactions table
+    return select(User.data_version).where(User.id == user_id)
+
+
+def data_state_query(user_id: UUID) -> Select:
+    # The version with the initial balance it covers, so a body built from
+    # this balance is never labelled with a newer version
+    return select(User.data_version, User.initial_balance).where(User.id == user_id)
+
+
+def data_state(db: Session, user_id: UUID) -> Tuple[int, Optional[float]]:
+    return tuple(db.execute(data_state_query(user_id)).one())
+
+
+def data_etag(resource: str, user_id: UUID, version: int, variant: str = "") -> str:
+    """Weak ETag for a per-user resource at a data version.
+
+    variant distinguishes representations of the same data, e.g. different
+    filters on a list; it is hashed so the tag stays short.
+    """
+    tag = f"{resource}-{user_id.hex}-{version}"
+    if variant:
+        tag += "-" + hashlib.sha1(variant.encode("utf-8")).hexdigest()[:16]
+    return f'W/"{tag}"'
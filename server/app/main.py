@@ -1,12 +1,42 @@
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy.engine import make_url
+from app.ai.jobs import job_manager
 from app.auth.jwt import get_current_user
+from app.db.catalog import category_catalog
+from app.db.database import DATABASE_URL, pool_status
+from app.observability.log import RequestIdMiddleware, configure_logging
+from app.observability.metrics import METRICS_ENABLED, MetricsMiddleware, metrics_response
+from app.observability.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.routers.budgets import router as BudgetRouter
+from app.routers.debug import DEBUG_ENDPOINTS_ENABLED, router as DebugRouter
 from app.routers.users import router as AuthRouter
 from app.routers.transactions import router as TransactionRouter
 
-app = FastAPI()
+configure_logging()
+logger = logging.getLogger(__name__)
 
-print("Starting FastAPI application...")
+# Responses smaller than this aren't worth compressing; level trades CPU for size
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting FastAPI application", extra={"database": make_url(DATABASE_URL).render_as_string(hide_password=True)})
+    # Warm the category catalog so the first requests don't pay for loading it
+    try:
+        category_catalog.refresh()
+    except Exception as e:
+        logger.warning("Category catalog not loaded at startup, will load on first use: %s", e)
+    yield
+    # Queued insights jobs are dropped; running ones finish in their threads
+    job_manager.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -15,15 +45,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-DB-Query-Count", "X-Request-ID"],
 )
 
-print("Registering routers...")
+# Mainly for large transaction lists; event streams are left uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+
+# Per-request query count, DB time and LLM time (opt-in)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Added last so it wraps everything and the request id is set for all logging
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(AuthRouter, )
 app.include_router(TransactionRouter)
-print("Routers registered")
+app.include_router(BudgetRouter)
+if DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(DebugRouter)
 
 @app.get("/")
 def read_root():
-    print("Root endpoint hit")
-    return {"message": "Welcome to FinAI API"}
\ No newline at end of file
+    return {"message": "Welcome to FinAI API"}
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        # Prometheus scrape endpoint; each worker process reports its own values
+        return metrics_response()
+
+if DEBUG_ENDPOINTS_ENABLED:
+    @app.get("/health/db")
+    def db_health():
+        # Pool occupancy and how long requests have waited for a connection
+        return pool_status()
@@ -0,0 +1,117 @@
+import os
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Insights requests take seconds, everything else milliseconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to response headers, by route and status",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled")
+
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds", "LLM call latency by insights section",
+    ["section"], buckets=LATENCY_BUCKETS,
+)
+llm_request_errors = Counter(
+    "llm_request_errors_total", "Failed insights sections by cause (error, invalid, timeout)",
+    ["section", "kind"],
+)
+llm_prompt_chars = Histogram("llm_prompt_chars", "Prompt size in characters", ["section"], buckets=SIZE_BUCKETS)
+llm_response_chars = Histogram("llm_response_chars", "Response size in characters", ["section"], buckets=SIZE_BUCKETS)
+
+
+def observe_llm_call(section: str, seconds: float, prompt: str, response: str = None):
+    llm_request_duration.labels(section).observe(seconds)
+    llm_prompt_chars.labels(section).observe(len(prompt))
+    if response is not None:
+        llm_response_chars.labels(section).observe(len(response))
+
+
+def count_llm_error(section: str, kind: str):
+    llm_request_errors.labels(section, kind).inc()
+
+
+class StateCollector:
+    """Reads pool and cache state at scrape time rather than on every request."""
+
+    def describe(self):
+        # Without this, register() calls collect() at import time, which
+        # imports the insights and database modules mid-initialisation
+        return []
+
+    def collect(self):
+        # Imported here so this module doesn't pull in the database or caches on import
+        from app.ai.cache import insights_cache
+        from app.ai.insights import insights_flights, llm_limiter
+        from app.auth.jwt import principal_cache, token_cache
+        from app.db.database import pool_status
+
+        pools = pool_status()
+        connections = GaugeMetricFamily("db_pool_connections", "Connections in the pool by engine and state", labels=["engine", "state"])
+        checkouts = CounterMetricFamily("db_pool_checkouts", "Successful pool checkouts", labels=["engine"])
+        timeouts = CounterMetricFamily("db_pool_checkout_timeouts", "Pool checkouts that timed out", labels=["engine"])
+        wait_avg = GaugeMetricFamily("db_pool_checkout_wait_avg_seconds", "Mean pool checkout wait", labels=["engine"])
+        wait_max = GaugeMetricFamily("db_pool_checkout_wait_max_seconds", "Longest pool checkout wait", labels=["engine"])
+        for name, status in pools.items():
+            # No series for an uninstrumented pool rather than zeros
+            if not status["instrumented"]:
+                continue
+            for state in ("size", "checked_out", "checked_in", "overflow"):
+                connections.add_metric([name, state], status[state])
+            wait = status["wait"]
+            checkouts.add_metric([name], wait["checkouts"])
+            timeouts.add_metric([name], wait["timeouts"])
+            wait_avg.add_metric([name], wait["avg_wait_ms"] / 1000)
+            wait_max.add_metric([name], wait["max_wait_ms"] / 1000)
+        yield from (connections, checkouts, timeouts, wait_avg, wait_max)
+
+        caches = {"insights": insights_cache, "token": token_cache, "principal": principal_cache}
+        for kind in ("hits", "misses", "evictions"):
+            family = CounterMetricFamily(f"cache_{kind}", f"Cache {kind} by cache", labels=["cache"])
+            for name, cache in caches.items():
+                family.add_metric([name], getattr(cache, kind))
+            yield family
+        entries = GaugeMetricFamily("cache_entries", "Entries currently held by cache", labels=["cache"])
+        for name, cache in caches.items():
+            entries.add_metric([name], len(cache))
+        yield entries
+
+        yield CounterMetricFamily("insights_generations", "Insights generations started (single-flight leaders)", value=insights_flights.leaders)
+        yield CounterMetricFamily("insights_coalesced", "Insights requests that shared another request's generation", value=insights_flights.followers)
+        yield GaugeMetricFamily("insights_generations_active", "Insights generations holding an LLM slot", value=llm_limiter.active)
+        yield CounterMetricFamily("insights_rejected", "Insights requests turned away at the concurrency limit", value=llm_limiter.rejected)
+
+
+REGISTRY.register(StateCollector())
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            http_requests_in_flight.dec()
+            # Label by route template, not the raw path, to keep cardinality bounded
+            route = request.scope.get("route")
+            http_request_duration.labels(
+                request.method, route.path if route is not None else "unmatched", str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
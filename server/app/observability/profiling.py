@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+# Opt-in: adds a few microseconds per query and per request
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Requests kept per route for the rolling summary
+PROFILING_WINDOW = int(os.getenv("PROFILING_WINDOW", "500"))
+
+
+class RequestProfile:
+    """What one request spent on the database and the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.slowest_time = 0.0
+        self.llm_calls = 0
+        self.llm_time = 0.0
+
+    def record_query(self, statement: str, seconds: float):
+        with self._lock:
+            self.query_count += 1
+            self.db_time += seconds
+            if seconds > self.slowest_time:
+                self.slowest_time = seconds
+                self.slowest_statement = statement
+
+    def record_llm_call(self, seconds: float):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_time += seconds
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def record_llm_call(seconds: float):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record_llm_call(seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    starts = conn.info.get("query_start")
+    if profile is not None and starts:
+        profile.record_query(statement, time.perf_counter() - starts.pop())
+
+
+def install_query_listeners():
+    """Time every statement on every engine. Idempotent.
+
+    Called when ProfilingMiddleware is set up, so apps without profiling
+    don't pay for the listeners on each query.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RouteStats:
+    """Rolling per-route window of request profiles."""
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._slowest: Dict[str, tuple] = {}
+
+    def add(self, route: str, duration: float, profile: RequestProfile):
+        with self._lock:
+            self._samples[route].append((duration, profile.query_count, profile.db_time, profile.llm_time))
+            if profile.slowest_statement and profile.slowest_time > self._slowest.get(route, (0.0, None))[0]:
+                self._slowest[route] = (profile.slowest_time, profile.slowest_statement)
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            samples = {route: list(values) for route, values in self._samples.items()}
+            slowest = dict(self._slowest)
+
+        result = {}
+        for route, values in sorted(samples.items()):
+            durations = sorted(v[0] for v in values)
+            queries = [v[1] for v in values]
+            slowest_time, slowest_statement = slowest.get(route, (0.0, None))
+            result[route] = {
+                "requests": len(values),
+                "p50_ms": round(durations[len(durations) // 2] * 1000, 2),
+                "p95_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 2),
+                "avg_queries": round(sum(queries) / len(values), 2),
+                "max_queries": max(queries),
+                "avg_db_ms": round(sum(v[2] for v in values) / len(values) * 1000, 2),
+                "avg_llm_ms": round(sum(v[3] for v in values) / len(values) * 1000, 2),
+                "slowest_statement_ms": round(slowest_time * 1000, 2),
+                "slowest_statement": slowest_statement,
+            }
+        return result
+
+
+route_stats = RouteStats(PROFILING_WINDOW)
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Reports per-request query count, DB time and LLM time.
+
+    Results go to a Server-Timing header (visible in browser dev tools)
+    plus X-DB-Query-Count, and into route_stats for /debug/profile. For
+    streamed responses only the work done before the first byte counts;
+    LLM time is summed over calls, so it can exceed the wall-clock total.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        install_query_listeners()
+
+    async def dispatch(self, request: Request, call_next):
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            current_profile.reset(token)
+        duration = time.perf_counter() - start
+
+        route = request.scope.get("route")
+        route_key = f"{request.method} {route.path if route is not None else 'unmatched'}"
+        route_stats.add(route_key, duration, profile)
+
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={profile.db_time * 1000:.2f};desc="{profile.query_count} queries"',
+            f'llm;dur={profile.llm_time * 1000:.2f};desc="{profile.llm_calls} calls"',
+            f"total;dur={duration * 1000:.2f}",
+        ])
+        response.headers["X-DB-Query-Count"] = str(profile.query_count)
+        return response
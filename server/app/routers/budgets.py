@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from app.auth.jwt import Principal, get_current_principal
+from app.db.budgets import budget_status
+from app.db.catalog import category_catalog
+from app.db.database import get_db
+from app.db.model import Budget
+from app.db.rollup import month_key
+from app.schemas.budget import BudgetResponse, BudgetStatusResponse, BudgetUpdate
+
+router = APIRouter(
+    prefix="/budgets",
+    tags=["budgets"]
+)
+
+@router.get("", response_model=List[BudgetResponse])
+def get_budgets(
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    return db.query(Budget).filter(Budget.user_id == user.id).all()
+
+@router.get("/status", response_model=BudgetStatusResponse)
+def get_budget_status(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM, defaults to the current month"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    # Read from the month-to-date rollup counters, never from the transactions table
+    month = month or month_key(datetime.utcnow())
+    return {"month": month, "budgets": budget_status(db, user.id, month)}
+
+@router.put("/{category_id}", response_model=BudgetResponse)
+def set_budget(
+    category_id: UUID,
+    budget: BudgetUpdate,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    if not category_catalog.get(category_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+
+    db_budget = db.get(Budget, (user.id, category_id))
+    if db_budget is None:
+        db_budget = Budget(user_id=user.id, category_id=category_id)
+        db.add(db_budget)
+    db_budget.amount = budget.amount
+    db_budget.alert_threshold_pct = budget.alert_threshold_pct
+    db_budget.updated_at = datetime.utcnow()
+    db.commit()
+    return db_budget
+
+@router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_budget(
+    category_id: UUID,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    deleted = db.query(Budget).filter(Budget.user_id == user.id, Budget.category_id == category_id).delete()
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Budget not found"
+        )
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
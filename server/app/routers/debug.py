@@ -0,0 +1,40 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel, Field
+from app.observability.log import log_levels, set_debug_sample_rate, set_log_level
+from app.observability.profiling import PROFILING_ENABLED, route_stats
+
+# Internal diagnostics; only mounted when explicitly enabled
+DEBUG_ENDPOINTS_ENABLED = os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"]
+)
+
+class LogLevelUpdate(BaseModel):
+    logger: Optional[str] = None  # None for the root logger
+    level: Optional[str] = None
+    debug_sample_rate: Optional[float] = Field(None, ge=0, le=1)
+
+@router.get("/profile")
+def get_profile_summary():
+    # Rolling per-route query counts and timings collected by ProfilingMiddleware
+    return {"enabled": PROFILING_ENABLED, "routes": route_stats.summary()}
+
+@router.get("/logging")
+def get_log_levels():
+    return log_levels()
+
+@router.put("/logging")
+def update_log_levels(update: LogLevelUpdate):
+    # Turn logging up or down without a restart; not persisted
+    if update.level is not None:
+        try:
+            set_log_level(update.logger, update.level)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if update.debug_sample_rate is not None:
+        set_debug_sample_rate(update.debug_sample_rate)
+    return log_levels()
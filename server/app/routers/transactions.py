@@ -1,125 +1,440 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
-from app.db.model import Transaction, Category, User
-from app.auth.jwt import get_current_user
-from app.schemas.transaction import TransactionCreate, TransactionResponse, CategoryResponse
-from app.ai.insights import analyze_transactions
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+import csv
+import io
+import json
+import logging
+import os
+from app.db.database import get_db, get_async_db, SessionLocal
+from app.db.model import Transaction, Category, User, TransactionType
+from app.db.catalog import category_catalog
+from app.db.queries import transaction_filters, transaction_list_query, transaction_row, after_cursor, encode_cursor
+from app.db.budgets import check_budget
+from app.db.rollup import apply_to_rollup
+from app.db.versions import bump_data_version, data_etag, data_state_query, data_version_query
+from app.auth.jwt import Principal, get_current_principal, get_current_principal_async, invalidate_principal
+from app.schemas.transaction import (
+    TransactionCreate, TransactionCreateResponse, TransactionResponse, CategoryResponse,
+    TransactionImportRow, TransactionImportRequest, TransactionImportResponse
+)
+from app.ai.insights import InsightsBusy, get_user_insights, stream_user_insights
+from app.ai.cache import data_fingerprint, invalidate_insights
+from app.ai.jobs import job_manager, JobQueueFull
+from app.schemas.insights import InsightsJobResponse
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/transactions",
     tags=["transactions"]
 )
 
-print("Initializing transactions router...")
 
-@router.post("", response_model=TransactionResponse)
+# Page size of GET /transactions when none is given, and its upper bound
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Rows fetched from the server-side cursor per chunk of /transactions/export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = ["id", "created_at", "amount", "transaction_type", "category_id", "category", "description"]
+
+# Rows per multi-row INSERT statement and per-request cap for bulk imports
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+
+@router.post("", response_model=TransactionCreateResponse)
 def create_transaction(
     transaction: TransactionCreate,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    user: Principal = Depends(get_current_principal)
 ):
-    # Get user from database
-    user = db.query(User).filter(User.username == current_user).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Verify category exists
-    category = db.query(Category).filter(Category.id == transaction.category_id).first()
+    category = category_catalog.get(transaction.category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
 
-    # Create transaction
+    # Create transaction; id and timestamp are set here so the response needs no refresh
+    transaction_id = uuid4()
     db_transaction = Transaction(
+        id=transaction_id,
         amount=transaction.amount,
         transaction_type=transaction.transaction_type,
         category_id=transaction.category_id,
         description=transaction.description,
-        user_id=user.id
+        user_id=user.id,
+        created_at=datetime.utcnow()
     )
     
     db.add(db_transaction)
+    # Versioned first: the users row lock is what orders this write against a rollup rebuild
+    bump_data_version(db, user.id)
+    apply_to_rollup(db, [{
+        "user_id": user.id,
+        "created_at": db_transaction.created_at,
+        "category_id": db_transaction.category_id,
+        "transaction_type": db_transaction.transaction_type,
+        "amount": db_transaction.amount,
+    }])
+    # Evaluated against the month-to-date counter the upsert above just updated
+    budget_alerts = []
+    if db_transaction.transaction_type == TransactionType.EXPENSE:
+        budget_alerts = check_budget(db, user.id, category.id, db_transaction.created_at, db_transaction.amount)
     db.commit()
-    db.refresh(db_transaction)
-    
-    # Re-query to get the transaction with category
-    return db.query(Transaction).join(Transaction.category).filter(Transaction.id == db_transaction.id).first()
+    invalidate_insights(user.id)
+    for alert in budget_alerts:
+        logger.info("Budget %s", alert["level"], extra={"user_id": str(user.id), "category": alert["category"]})
+
+    # Built from what we inserted: reading db_transaction after commit would reload it
+    return {
+        "id": transaction_id,
+        "amount": transaction.amount,
+        "transaction_type": transaction.transaction_type,
+        "category_id": category.id,
+        "category": {"id": category.id, "name": category.name},
+        "description": transaction.description,
+        "user_id": user.id,
+        "budget_alerts": budget_alerts,
+    }
+
+def _import_transactions(db: Session, user: Principal, rows: List[Dict[str, Any]], chunk_size: int) -> Dict:
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {IMPORT_MAX_ROWS} rows can be imported per request"
+        )
+
+    now = datetime.utcnow()
+    values = []
+    errors = []
+    for index, raw in enumerate(rows, start=1):
+        try:
+            row = TransactionImportRow.model_validate(raw)
+        except ValidationError as e:
+            errors.append({"row": index, "error": "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )})
+            continue
+
+        # Validated against the in-memory catalog, not a query per row
+        if row.category_id is not None:
+            category = category_catalog.get(row.category_id)
+        elif row.category:
+            category = category_catalog.get_by_name(row.category)
+        else:
+            errors.append({"row": index, "error": "category_id or category is required"})
+            continue
+        if category is None:
+            errors.append({"row": index, "error": "Category not found"})
+            continue
+
+        created_at = row.created_at or now
+        # Stored as naive UTC like every other timestamp, so rollup months and
+        # keyset cursors compare like with like
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+        values.append({
+            "id": uuid4(),
+            "user_id": user.id,
+            "amount": row.amount,
+            "transaction_type": row.transaction_type,
+            "category_id": category.id,
+            "description": row.description,
+            "created_at": created_at,
+        })
+
+    # Valid rows go in as multi-row INSERTs, committed together
+    try:
+        if values:
+            bump_data_version(db, user.id)
+        for start in range(0, len(values), chunk_size):
+            db.execute(insert(Transaction), values[start:start + chunk_size])
+        apply_to_rollup(db, values)
+        db.commit()
+        invalidate_insights(user.id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing transactions: {str(e)}"
+        )
+
+    return {"imported": len(values), "failed": len(errors), "errors": errors}
+
+@router.post("/import", response_model=TransactionImportResponse)
+def import_transactions(
+    request: TransactionImportRequest,
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    return _import_transactions(db, user, request.transactions, chunk_size)
+
+@router.post("/import/csv", response_model=TransactionImportResponse)
+def import_transactions_csv(
+    csv_body: str = Body(..., media_type="text/csv"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    # Header row names the columns; empty cells are treated as missing
+    reader = csv.DictReader(io.StringIO(csv_body))
+    rows = [
+        {key.strip(): value for key, value in record.items() if key and value not in (None, "")}
+        for record in reader
+    ]
+    return _import_transactions(db, user, rows, chunk_size)
+
+def _not_modified(request: Request, etag: str, cache_control: str = "private, no-cache") -> Optional[Response]:
+    # A 304 for a client whose If-None-Match already has this representation
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
 
 @router.get("/categories", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    return db.query(Category).all()
+def get_categories(request: Request, response: Response):
+    # Served from the in-memory catalog; clients revalidate with If-None-Match
+    etag = f'W/"categories-{category_catalog.current_version()}"'
+    not_modified = _not_modified(request, etag, "no-cache")
+    if not_modified is not None:
+        return not_modified
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return [{"id": c.id, "name": c.name} for c in category_catalog.all()]
 
 @router.get("", response_model=List[TransactionResponse])
-def get_transactions(
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+async def get_transactions(
+    request: Request,
+    # 0 returns the full history, for clients written before pagination
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=0, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
+    category_id: Optional[UUID] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async)
 ):
-    user = db.query(User).filter(User.username == current_user).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+    # Unchanged data revalidates without touching the transactions table.
+    # The tag covers the query string, so each filter/page has its own.
+    version = await db.scalar(data_version_query(user.id))
+    etag = data_etag("transactions", user.id, version, str(sorted(request.query_params.multi_items())))
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # Plain column tuples from one joined SELECT: no ORM identity map, no
+    # per-row model validation. response_model still documents the shape.
+    query = transaction_list_query(transaction_filters(user.id, start_date, end_date, transaction_type, category_id))
+    if cursor:
+        try:
+            query = query.where(after_cursor(cursor))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc())
+
+    if limit == 0:
+        rows = (await db.execute(query)).all()
+        return ORJSONResponse([transaction_row(row) for row in rows], headers=headers)
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return ORJSONResponse([transaction_row(row) for row in rows], headers=headers)
+
+def _export_rows(criteria: list, export_format: str):
+    # Runs after the request's session is closed, so it owns its own session
+    db = SessionLocal()
+    try:
+        if export_format == "csv":
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+        statement = (
+            select(
+                Transaction.id,
+                Transaction.created_at,
+                Transaction.amount,
+                Transaction.transaction_type,
+                Transaction.category_id,
+                Category.name,
+                Transaction.description,
+            )
+            .join(Category, Transaction.category_id == Category.id)
+            .where(*criteria)
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
         )
-    
-    transactions = db.query(Transaction).join(Transaction.category).filter(Transaction.user_id == user.id).all()
-    return transactions
+        result = db.execute(statement)
+
+        # One chunk per batch keeps memory flat regardless of history size
+        for rows in result.partitions():
+            buffer = io.StringIO()
+            if export_format == "csv":
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow([
+                        row.id,
+                        row.created_at.isoformat(),
+                        row.amount,
+                        row.transaction_type.value,
+                        row.category_id,
+                        row.name,
+                        row.description or "",
+                    ])
+            else:
+                for row in rows:
+                    buffer.write(json.dumps({
+                        "id": str(row.id),
+                        "created_at": row.created_at.isoformat(),
+                        "amount": row.amount,
+                        "transaction_type": row.transaction_type.value,
+                        "category_id": str(row.category_id),
+                        "category": row.name,
+                        "description": row.description,
+                    }))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_transactions(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
+    category_id: Optional[UUID] = None,
+    user: Principal = Depends(get_current_principal)
+):
+    criteria = transaction_filters(user.id, start_date, end_date, transaction_type, category_id)
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(criteria, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{export_format}"'}
+    )
 
 @router.get("/insights")
 def get_insights(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    user: Principal = Depends(get_current_principal)
 ):
-    print(f"Getting insights for user: {current_user}")
+    # Version and balance are read together before generating, so the tag is
+    # never newer than the body it labels. Metrics depend on the current
+    # month, hence the date.
+    fingerprint = data_fingerprint(db, user.id)
+    etag = data_etag("insights", user.id, fingerprint[0], datetime.utcnow().date().isoformat())
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
     try:
-        user = db.query(User).filter(User.username == current_user).first()
-        if not user:
-            print(f"User not found: {current_user}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        print(f"Fetching transactions for user_id: {user.id}")
-        transactions = db.query(Transaction).join(Transaction.category).filter(Transaction.user_id == user.id).all()
-        print(f"Found {len(transactions)} transactions")
-        
-        print(f"Analyzing transactions with initial balance: {user.initial_balance or 0}")
-        insights = analyze_transactions(transactions, user.initial_balance or 0)
-        print("Successfully generated insights")
-        return insights
+        insights = get_user_insights(db, user.id, fingerprint)
+    except InsightsBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "2"}
+        )
     except Exception as e:
-        print(f"Error in get_insights: {str(e)}")
+        logger.exception("Error in get_insights")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating insights: {str(e)}"
         )
+    # Failed sections are retried on the next request, so only complete results are tagged
+    if "error" not in insights and "errors" not in insights:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+    return insights
 
-@router.get("/status")
-def get_transaction_status(
+def _server_sent_events(events):
+    for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/insights/stream")
+def stream_insights(
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    user: Principal = Depends(get_current_principal)
 ):
-    user = db.query(User).filter(User.username == current_user).first()
-    if not user:
+    # Metrics go out as the first event; each section follows as soon as its LLM call finishes
+    events = stream_user_insights(db, user.id)
+    return StreamingResponse(
+        _server_sent_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/insights/jobs", response_model=InsightsJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_insights_job(
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal)
+):
+    try:
+        return job_manager.submit(user.id, data_fingerprint(db, user.id))
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many insights jobs in progress. Please try again shortly.",
+            headers={"Retry-After": "5"}
+        )
+
+@router.get("/insights/jobs/{job_id}", response_model=InsightsJobResponse)
+def get_insights_job(
+    job_id: UUID,
+    user: Principal = Depends(get_current_principal)
+):
+    job = job_manager.get(job_id)
+    # Someone else's job is reported exactly like a missing one
+    if job is None or job.user_id != user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            detail="Insights job not found"
         )
-    
+    return job
+
+@router.get("/status")
+async def get_transaction_status(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async)
+):
+    # Balance read with the version, so it is never older than the tag
+    version, initial_balance = (await db.execute(data_state_query(user.id))).one()
+    etag = data_etag("status", user.id, version)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
     # Check if user has any transactions
-    has_transactions = db.query(Transaction).filter(Transaction.user_id == user.id).first() is not None
-    
+    has_transactions = await db.scalar(select(Transaction.id).where(Transaction.user_id == user.id).limit(1)) is not None
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
     return {
         "has_transactions": has_transactions,
-        "initial_balance": user.initial_balance
+        "initial_balance": initial_balance
     }
 
 from pydantic import BaseModel
@@ -131,16 +446,14 @@ class InitialBalanceRequest(BaseModel):
 def set_initial_balance(
     request: InitialBalanceRequest,
     db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    user: Principal = Depends(get_current_principal)
 ):
-    user = db.query(User).filter(User.username == current_user).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    user.initial_balance = request.balance
+    db.query(User).filter(User.id == user.id).update({
+        User.initial_balance: request.balance,
+        User.data_version: User.data_version + 1,
+    })
     db.commit()
+    invalidate_principal(user.username)
+    invalidate_insights(user.id)
     
     return {"message": "Initial balance set successfully"}
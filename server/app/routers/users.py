@@ -1,19 +1,30 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.db.model import User
-from app.auth.hashing import hash_password, verify_password
+from app.auth.hashing import hash_password_async, verify_password_async, needs_rehash, PasswordHasherBusy
 from app.auth.jwt import create_access_token
 from app.schemas.auth import UserCreate, UserLogin, Token, User as UserSchema
-from app.auth.jwt import get_current_user
+from app.auth.jwt import Principal, get_current_principal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/auth",
     tags=["authentication"]
 )
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests right now. Please try again shortly.",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/register", response_model=UserSchema)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Validate email format
     if not "@" in user.email:
         raise HTTPException(
@@ -36,14 +47,14 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email exists
-    if db.query(User).filter(User.email == user.email).first():
+    if await db.scalar(select(User.id).where(User.email == user.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Email '{user.email}' is already registered. Please use a different email or try logging in."
         )
     
     # Check if username exists
-    if db.query(User).filter(User.username == user.username).first():
+    if await db.scalar(select(User.id).where(User.username == user.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Username '{user.username}' is already taken. Please choose a different username."
@@ -51,8 +62,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 
     try:
         # Hash the password
-        hashed_password = hash_password(user.password)
-        print(f"Generated hash: {hashed_password}")
+        hashed_password = await hash_password_async(user.password)
         
         # Create new user
         db_user = User(
@@ -62,66 +72,72 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             password=hashed_password
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
         return db_user
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     except Exception as e:
-        print(f"Error during registration: {str(e)}")
-        db.rollback()
+        logger.exception("Error during registration")
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error during registration: {str(e)}"
         )
 
 @router.get("/me", response_model=UserSchema)
-def get_current_user_info(db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    user = db.query(User).filter(User.username == current_user).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+def get_current_user_info(user: Principal = Depends(get_current_principal)):
     return user
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     try:
         # Try to find user by email
-        db_user = db.query(User).filter(User.email == user.email).first()
+        db_user = await db.scalar(select(User).where(User.email == user.email))
         if not db_user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="No account found with this email. Please check your email or sign up."
             )
         
-        print(f"Found user: {db_user.email}, attempting password verification")
         # Verify password
         try:
-            is_valid = verify_password(user.password, db_user.password)
-            print(f"Password verification result: {is_valid}")
+            is_valid = await verify_password_async(user.password, db_user.password)
             if not is_valid:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Incorrect password. Please try again."
                 )
+        except (HTTPException, PasswordHasherBusy):
+            raise
         except Exception as ve:
-            print(f"Password verification error: {str(ve)}")
+            logger.warning("Password verification error: %s", ve)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=f"Error verifying password: {str(ve)}"
             )
 
+        # Upgrade hashes made with an older work factor while we have the plain password
+        if needs_rehash(db_user.password):
+            try:
+                db_user.password = await hash_password_async(user.password)
+                await db.commit()
+            except PasswordHasherBusy:
+                pass  # the user is authenticated either way; upgrade on a later login
+
         # Create access token
         access_token = create_access_token({
             "sub": db_user.username,
+            "uid": str(db_user.id),
             "email": db_user.email
         })
         
         return {"access_token": access_token, "token_type": "bearer"}
     except HTTPException as he:
         raise he
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.exception("Login error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while logging in: {str(e)}"
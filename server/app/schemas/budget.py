@@ -0,0 +1,39 @@
+from datetime import datetime
+from pydantic import BaseModel, UUID4, confloat, conint
+from typing import List
+
+class BudgetUpdate(BaseModel):
+    amount: confloat(gt=0)  # Monthly limit
+    alert_threshold_pct: conint(ge=1, le=100) = 80
+
+class BudgetResponse(BaseModel):
+    category_id: UUID4
+    amount: float
+    alert_threshold_pct: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class BudgetAlert(BaseModel):
+    category_id: UUID4
+    category: str
+    month: str
+    level: str  # "warning" or "exceeded"
+    budget: float
+    spent: float
+    alert_threshold_pct: int
+
+class BudgetStatus(BaseModel):
+    category_id: UUID4
+    category: str
+    budget: float
+    spent: float
+    remaining: float
+    percent_used: float
+    alert_threshold_pct: int
+    state: str  # "ok", "warning" or "exceeded"
+
+class BudgetStatusResponse(BaseModel):
+    month: str
+    budgets: List[BudgetStatus]
@@ -0,0 +1,15 @@
+from datetime import datetime
+from pydantic import BaseModel, UUID4
+from typing import Any, Dict, Optional
+
+class InsightsJobResponse(BaseModel):
+    id: UUID4
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
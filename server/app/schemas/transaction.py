@@ -1,6 +1,8 @@
 from pydantic import BaseModel, UUID4, confloat
 from app.db.model import TransactionType
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from app.schemas.budget import BudgetAlert
 
 class CategoryResponse(BaseModel):
     id: UUID4
@@ -26,3 +28,29 @@ class TransactionResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class TransactionCreateResponse(TransactionResponse):
+    # Budget thresholds this transaction crossed, if any
+    budget_alerts: List[BudgetAlert] = []
+
+class TransactionImportRow(BaseModel):
+    amount: confloat(gt=0)
+    transaction_type: TransactionType
+    # Either the category id or its name (as found on bank statements)
+    category_id: Optional[UUID4] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class TransactionImportRequest(BaseModel):
+    # Rows are validated one by one so a bad row doesn't reject the whole batch
+    transactions: List[Dict[str, Any]]
+
+class TransactionImportError(BaseModel):
+    row: int
+    error: str
+
+class TransactionImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TransactionImportError]
@@ -0,0 +1,105 @@
+"""Time the NumPy analytics engine behind metrics["advanced"].
+
+Builds synthetic histories of each --sizes transactions (no database
+needed), folds them into rollup-shaped monthly totals plus the recent
+anomaly window, and times app.ai.analytics.analyze_history on those. The
+cost should stay flat as the history grows. With --username it also times
+compute_metrics with and without the advanced metrics for that user in the
+configured DATABASE_URL (e.g. data from app.scripts.generate_data):
+
+    python -m app.scripts.bench_analytics --sizes 10000 100000 1000000
+    python -m app.scripts.bench_analytics --sizes 10000 --username gen7
+"""
+import argparse
+import json
+import time
+import numpy as np
+from app.ai.analytics import (
+    ANOMALY_MAX_ROWS, ANOMALY_WINDOW_DAYS, MonthlyTotals, RecentExpenses, analyze_history
+)
+
+CATEGORIES = [f"Category {i}" for i in range(17)]
+
+
+def synthetic_inputs(rows: int, seed: int = 42):
+    """The arrays analyze_history gets for a history of `rows` transactions."""
+    rng = np.random.default_rng(seed)
+    today = np.datetime64("today", "D").astype(np.int64)
+    days = np.sort(today - rng.integers(0, 5 * 365, rows))
+    amounts = np.round(rng.lognormal(6.5, 1.0, rows), 2)
+    is_income = rng.random(rows) < 0.1
+    categories = rng.integers(0, len(CATEGORIES), rows).astype(np.int16)
+
+    # What monthly_rollups holds: one total per (month, category, type)
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    cells, inverse = np.unique(np.column_stack([months, categories, is_income]), axis=0, return_inverse=True)
+    totals = MonthlyTotals(
+        months=cells[:, 0].astype(np.int64),
+        totals=np.bincount(inverse.ravel(), weights=amounts),
+        is_income=cells[:, 2].astype(bool),
+        categories=cells[:, 1].astype(np.int16),
+        category_names=CATEGORIES,
+    )
+
+    recent_mask = ~is_income & (days >= today - ANOMALY_WINDOW_DAYS)
+    recent_rows = np.flatnonzero(recent_mask)[::-1][:ANOMALY_MAX_ROWS]
+    recent = RecentExpenses(
+        days=days[recent_rows],
+        amounts=amounts[recent_rows],
+        categories=categories[recent_rows],
+        category_names=CATEGORIES,
+    )
+    return totals, recent
+
+
+def best_of(runs: int, fn) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--username", help="also time compute_metrics for this user from the database")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        totals, recent = synthetic_inputs(size)
+        print(json.dumps({
+            "rows": size,
+            "rollup_rows": len(totals),
+            "recent_rows": len(recent),
+            "analyze_ms": round(best_of(args.runs, lambda: analyze_history(totals, recent, 0.0)), 2),
+        }))
+
+    if args.username:
+        import app.ai.metrics as ai_metrics
+        from app.db.database import SessionLocal
+        from app.db.model import User
+
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.username == args.username).first()
+            if user is None:
+                print(f"No user named {args.username}")
+                return
+            timings = {}
+            for enabled in (False, True):
+                ai_metrics.ADVANCED_METRICS_ENABLED = enabled
+                timings[enabled] = best_of(args.runs, lambda: ai_metrics.compute_metrics(db, user.id, user.initial_balance or 0))
+            print(json.dumps({
+                "username": args.username,
+                "compute_metrics_ms": round(timings[False], 2),
+                "compute_metrics_advanced_ms": round(timings[True], 2),
+            }))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""End-to-end latency and throughput of the hot API endpoints.
+
+Starts the app under uvicorn in this process against a scratch database
+(dropped and recreated on every run) and the fake LLM provider, seeds
+--users users with --transactions each, then drives each scenario with an
+async HTTP client at every --concurrency level. Prints one JSON document,
+or writes it to --output, so runs can be diffed:
+
+    python -m app.scripts.bench_api --users 20 --transactions 2000 --concurrency 1 8 32
+    python -m app.scripts.bench_api --database-url postgresql://bench@localhost/bench_api \\
+        --scenarios list status insights --output before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+SCENARIOS = ["login", "create", "list", "status", "insights"]
+PASSWORD = "benchmark-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_api.db",
+                        help="scratch database; all tables are dropped")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=1000, help="per user")
+    parser.add_argument("--months", type=int, default=24, help="history spread for seeded transactions")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", default="300", help="fake LLM latency per call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    # Must happen before anything from app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = args.llm_latency_ms
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("METRICS_ENABLED", "false")
+
+
+def seed(args) -> list:
+    from sqlalchemy import insert
+    from app.auth.hashing import hash_password
+    from app.db.database import SessionLocal, create_database
+    from app.db.model import Category, Transaction, TransactionType, User
+    from app.db.rollup import rebuild_rollups
+    from app.scripts.seed import seed_categories
+
+    create_database()
+    rng = random.Random(args.seed)
+    hashed = hash_password(PASSWORD)
+    db = SessionLocal()
+    try:
+        seed_categories(db)
+        categories = db.query(Category.id).all()
+        users = [
+            {"email": f"bench{i}@example.com", "username": f"bench{i}", "password": hashed, "full_name": f"Bench {i}"}
+            for i in range(args.users)
+        ]
+        db.execute(insert(User), users)
+        user_ids = [row.id for row in db.query(User.id).order_by(User.username)]
+
+        now = datetime.utcnow()
+        span = timedelta(days=30 * args.months).total_seconds()
+        for user_id in user_ids:
+            rows = [
+                {
+                    "user_id": user_id,
+                    "amount": round(rng.uniform(50, 5000), 2),
+                    "transaction_type": TransactionType.INCOME if rng.random() < 0.2 else TransactionType.EXPENSE,
+                    "category_id": rng.choice(categories).id,
+                    "description": "benchmark",
+                    "created_at": now - timedelta(seconds=rng.uniform(0, span)),
+                }
+                for _ in range(args.transactions)
+            ]
+            for start in range(0, len(rows), 1000):
+                db.execute(insert(Transaction), rows[start:start + 1000])
+        rebuild_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+    return [user["email"] for user in users]
+
+
+def start_server():
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_level(client, make_request, concurrency: int, requests: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await make_request(i)
+
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal failures
+        for i in counter:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            failures += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": failures,
+        "throughput_rps": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def run_benchmarks(args, base_url: str, emails: list) -> list:
+    import httpx
+    from app.ai.cache import insights_cache
+
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        tokens = []
+        for email in emails:
+            response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+            response.raise_for_status()
+            tokens.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+        categories = (await client.get("/transactions/categories")).json()
+        rng = random.Random(args.seed)
+
+        def auth(i):
+            return tokens[i % len(tokens)]
+
+        scenarios = {
+            "login": lambda i: client.post("/auth/login", json={"email": emails[i % len(emails)], "password": PASSWORD}),
+            "create": lambda i: client.post("/transactions", headers=auth(i), json={
+                "amount": round(rng.uniform(50, 5000), 2),
+                "transaction_type": "expense",
+                "category_id": rng.choice(categories)["id"],
+                "description": "benchmark",
+            }),
+            "list": lambda i: client.get("/transactions", headers=auth(i), params={"limit": 50}),
+            "status": lambda i: client.get("/transactions/status", headers=auth(i)),
+            "insights": lambda i: client.get("/transactions/insights", headers=auth(i)),
+        }
+
+        results = []
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                if name == "insights":
+                    # Start every level cold; repeat requests per user then hit the cache
+                    insights_cache.clear()
+                result = await run_level(client, scenarios[name], concurrency, args.requests, args.warmup)
+                result["scenario"] = name
+                results.append(result)
+                print(f"{name:>9} c={concurrency:<4} p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                      f"{result['throughput_rps']} req/s", file=sys.stderr, flush=True)
+        return results
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    started_at = datetime.utcnow().isoformat(timespec="seconds")
+
+    emails = seed(args)
+    server, thread, base_url = start_server()
+    try:
+        results = asyncio.run(run_benchmarks(args, base_url, emails))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    report = {
+        "started_at": started_at,
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "environment": {"python": platform.python_version(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare single-row POST /transactions against the bulk import endpoint.
+
+Runs in-process against the configured DATABASE_URL (point it at a scratch
+database), e.g.:
+
+    python -m app.scripts.bench_import --rows 2000 --chunk-sizes 100 500 1000
+"""
+import argparse
+import random
+import time
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def login(client: TestClient) -> dict:
+    suffix = uuid4().hex[:8]
+    email = f"bench-{suffix}@example.com"
+    client.post("/auth/register", json={
+        "email": email,
+        "username": f"bench-{suffix}",
+        "password": "benchmark",
+        "full_name": "Benchmark User",
+    })
+    token = client.post("/auth/login", json={"email": email, "password": "benchmark"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_rows(categories: list, count: int) -> list:
+    return [
+        {
+            "amount": round(random.uniform(10, 2000), 2),
+            "transaction_type": random.choice(["income", "expense"]),
+            "category_id": random.choice(categories)["id"],
+            "description": "benchmark row",
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 500, 1000])
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    categories = client.get("/transactions/categories").json()
+    if not categories:
+        print("No categories found. Run app/scripts/seed.py first.")
+        return
+
+    headers = login(client)
+    rows = make_rows(categories, args.rows)
+    start = time.perf_counter()
+    for row in rows:
+        client.post("/transactions", json=row, headers=headers).raise_for_status()
+    single = time.perf_counter() - start
+    print(f"single-row: {args.rows} rows in {single:.2f}s ({args.rows / single:.0f} rows/s)")
+
+    for chunk_size in args.chunk_sizes:
+        headers = login(client)
+        rows = make_rows(categories, args.rows)
+        start = time.perf_counter()
+        response = client.post(
+            "/transactions/import",
+            params={"chunk_size": chunk_size},
+            json={"transactions": rows},
+            headers=headers,
+        )
+        response.raise_for_status()
+        elapsed = time.perf_counter() - start
+        print(
+            f"bulk chunk_size={chunk_size}: {response.json()['imported']} rows in {elapsed:.2f}s "
+            f"({args.rows / elapsed:.0f} rows/s, {single / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare prompt size, request count and latency of the insights prompt modes.
+
+Uses synthetic metrics and, unless LLM_PROVIDER says otherwise, the offline
+fake provider, so it needs neither a database nor network access:
+
+    python -m app.scripts.bench_insights_modes --months 60 --categories 12
+    LLM_PROVIDER=gemini python -m app.scripts.bench_insights_modes --runs 3
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "300")
+
+from app.ai.insights import analyze_transactions, build_consolidated_prompt, build_prompts, estimate_tokens
+
+
+def synthetic_metrics(months: int, categories: int) -> dict:
+    rng = random.Random(42)
+    monthly = {}
+    for i in range(months):
+        year, month = 2015 + i // 12, i % 12 + 1
+        monthly[f"{year:04d}-{month:02d}"] = {
+            "income": round(rng.uniform(40000, 90000), 2),
+            "expenses": round(rng.uniform(20000, 70000), 2),
+        }
+    by_category = {f"Category {i}": round(rng.uniform(1000, 50000), 2) for i in range(categories)}
+    total_income = sum(m["income"] for m in monthly.values())
+    total_expenses = sum(m["expenses"] for m in monthly.values())
+    return {
+        "total_income": total_income,
+        "total_expenses": total_expenses,
+        "current_balance": total_income - total_expenses,
+        "expense_by_category": by_category,
+        "monthly_trends": monthly,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--categories", type=int, default=11)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    metrics = synthetic_metrics(args.months, args.categories)
+    prompts = {
+        "separate": list(build_prompts(metrics).values()),
+        "consolidated": [build_consolidated_prompt(metrics)],
+    }
+
+    for mode, mode_prompts in prompts.items():
+        latencies = []
+        failures = 0
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = analyze_transactions(metrics, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            failures += "error" in result or "errors" in result
+        print(json.dumps({
+            "mode": mode,
+            "requests": len(mode_prompts),
+            "prompt_tokens_est": sum(estimate_tokens(p) for p in mode_prompts),
+            "latency_ms_p50": round(statistics.median(latencies), 1),
+            "latency_ms_max": round(max(latencies), 1),
+            "failed_runs": failures,
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Measure password verification throughput at different hashing pool sizes.
+
+Simulates a login burst: --clients request threads each verify a password
+through app.auth.hashing, the same path /auth/login takes. Requests the
+pool rejects (HTTP 503 in the API) are counted separately.
+
+    python -m app.scripts.bench_login --pool-sizes 1 2 4 8 --requests 200
+    python -m app.scripts.bench_login --kind process --rounds 10
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from app.auth import hashing
+
+
+def run(pool_size: int, queue_depth: int, kind: str, clients: int, requests: int, hashed: str) -> dict:
+    hashing.configure_password_executor(pool_size, queue_depth, kind)
+
+    def attempt(_):
+        start = time.perf_counter()
+        try:
+            hashing.verify_password("benchmark-password", hashed)
+            return time.perf_counter() - start, True
+        except hashing.PasswordHasherBusy:
+            return time.perf_counter() - start, False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(attempt, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    accepted = len(latencies)
+    return {
+        "kind": kind,
+        "pool_size": pool_size,
+        "queue_depth": queue_depth,
+        "accepted": accepted,
+        "rejected": requests - accepted,
+        "logins_per_s": round(accepted / elapsed, 1),
+        "p50_ms": round(latencies[accepted // 2] * 1000, 1) if accepted else None,
+        "p99_ms": round(latencies[min(accepted - 1, int(accepted * 0.99))] * 1000, 1) if accepted else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 8])
+    parser.add_argument("--queue-depth", type=int, default=hashing.PASSWORD_HASH_QUEUE_DEPTH)
+    parser.add_argument("--kind", choices=["thread", "process"], default="thread")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent simulated requests")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=hashing.BCRYPT_ROUNDS, help="bcrypt cost of the test hash")
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"benchmark-password", bcrypt.gensalt(rounds=args.rounds)).decode("utf-8")
+    for pool_size in args.pool_sizes:
+        print(json.dumps(run(pool_size, args.queue_depth, args.kind, args.clients, args.requests, hashed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare ways of building the GET /transactions response body.
+
+For one user's most recent --limit transactions, times querying plus
+serialising to JSON bytes three ways and counts the SQL statements each
+issues:
+
+  orm_lazy       ORM objects, Transaction.category lazy-loaded, pydantic + json
+  orm_eager      ORM objects with contains_eager (the previous implementation)
+  tuples_orjson  column tuples -> dicts -> orjson (the current implementation)
+
+Point DATABASE_URL at a database with data, e.g. from app.scripts.generate_data:
+
+    python -m app.scripts.bench_transaction_list --username gen7 --limits 50 500 5000
+"""
+import argparse
+import json
+import time
+from typing import List
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import event, select
+from sqlalchemy.orm import contains_eager
+from app.db.database import SessionLocal, engine
+from app.db.model import Transaction, User
+from app.db.queries import transaction_filters, transaction_list_query, transaction_row
+from app.schemas.transaction import TransactionResponse
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+response_adapter = TypeAdapter(List[TransactionResponse])
+ORDER = (Transaction.created_at.desc(), Transaction.id.desc())
+
+
+def orm_lazy(db, user_id, limit):
+    rows = db.scalars(select(Transaction).where(*transaction_filters(user_id)).order_by(*ORDER).limit(limit)).all()
+    return response_adapter.dump_json(response_adapter.validate_python(rows))
+
+
+def orm_eager(db, user_id, limit):
+    rows = db.scalars(
+        select(Transaction)
+        .join(Transaction.category)
+        .options(contains_eager(Transaction.category))
+        .where(*transaction_filters(user_id))
+        .order_by(*ORDER)
+        .limit(limit)
+    ).all()
+    return response_adapter.dump_json(response_adapter.validate_python(rows))
+
+
+def tuples_orjson(db, user_id, limit):
+    rows = db.execute(transaction_list_query(transaction_filters(user_id)).order_by(*ORDER).limit(limit)).all()
+    return orjson.dumps([transaction_row(row) for row in rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--limits", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    global statements
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == args.username).first()
+        if user is None:
+            print(f"No user named {args.username}")
+            return
+        user_id = user.id
+
+    for limit in args.limits:
+        bodies = {}
+        for name, fn in (("orm_lazy", orm_lazy), ("orm_eager", orm_eager), ("tuples_orjson", tuples_orjson)):
+            timings = []
+            for _ in range(args.runs):
+                # Fresh session each run so the identity map doesn't carry over
+                with SessionLocal() as db:
+                    statements = 0
+                    start = time.perf_counter()
+                    body = fn(db, user_id, limit)
+                    timings.append(time.perf_counter() - start)
+                    queries = statements
+            rows = len(json.loads(body))
+            bodies[name] = json.loads(body)
+            best = min(timings)
+            print(json.dumps({
+                "limit": limit,
+                "path": name,
+                "rows": rows,
+                "queries": queries,
+                "best_ms": round(best * 1000, 2),
+                "us_per_row": round(best / max(rows, 1) * 1e6, 2),
+            }))
+        if len({json.dumps(body, sort_keys=True) for body in bodies.values()}) != 1:
+            print("WARNING: response bodies differ between paths")
+
+
+if __name__ == "__main__":
+    main()
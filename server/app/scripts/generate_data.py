@@ -0,0 +1,307 @@
+"""Generate users and realistic transaction histories in bulk.
+
+Each user gets a salary on a fixed payday, recurring bills (rent, utilities,
+insurance, ...), Poisson-distributed day-to-day spending with seasonal peaks
+(festive shopping in Oct/Nov, summer electricity) and occasional side
+income. Sampling is vectorised with NumPy and seeded, so the same arguments
+always produce the same data. Rows are bulk-loaded with COPY on PostgreSQL
+(psycopg2) and chunked executemany elsewhere; categories are seeded first
+if missing, and the monthly rollups for the new users are aggregated in
+NumPy and inserted alongside their transactions.
+
+    python -m app.scripts.generate_data --users 1000 --months 36
+    python -m app.scripts.generate_data --users 20000 --months 60 --prefix load --chunk-size 50000
+"""
+import argparse
+import csv
+import io
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.auth.hashing import hash_password
+from app.db.database import SessionLocal, engine
+from app.db.model import Base, Category, MonthlyRollup, Transaction, TransactionType, User
+from app.scripts.seed import seed_categories
+
+def seasonal(**peaks: float) -> np.ndarray:
+    """Per-calendar-month multipliers, e.g. seasonal(oct=1.8) -> 1.0 except October."""
+    names = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+    return np.array([peaks.get(name, 1.0) for name in names])
+
+
+@dataclass(frozen=True)
+class Stream:
+    """One source of transactions, e.g. a monthly rent payment or grocery runs."""
+    description: str
+    category: str
+    transaction_type: TransactionType
+    participation: float  # share of users who have this stream at all
+    amount: float  # median amount for a user with the median salary
+    amount_sigma: float  # lognormal spread of individual amounts
+    income_elasticity: float = 0.6  # how strongly amounts scale with the user's salary
+    per_month: Optional[float] = None  # Poisson rate; None means exactly once a month on a fixed day
+    season: Tuple[float, ...] = (1.0,) * 12  # January first
+
+
+STREAMS: List[Stream] = [
+    Stream("Salary", "Salary", TransactionType.INCOME, 0.92, 60000, 0.02, income_elasticity=1.0),
+    Stream("Freelance project", "Freelance", TransactionType.INCOME, 0.25, 15000, 0.6, per_month=0.4),
+    Stream("Dividend / interest", "Investments", TransactionType.INCOME, 0.35, 4000, 0.8, per_month=0.3),
+    Stream("Rent", "Housing", TransactionType.EXPENSE, 0.7, 18000, 0.01, income_elasticity=0.8),
+    Stream("Electricity and water", "Utilities", TransactionType.EXPENSE, 0.95, 2500, 0.15,
+           season=tuple(seasonal(apr=1.3, may=1.5, jun=1.4))),
+    Stream("Phone and internet", "Utilities", TransactionType.EXPENSE, 0.9, 900, 0.02, income_elasticity=0.2),
+    Stream("Insurance premium", "Insurance", TransactionType.EXPENSE, 0.5, 2500, 0.02),
+    Stream("School / course fees", "Education", TransactionType.EXPENSE, 0.25, 8000, 0.05,
+           season=tuple(seasonal(jun=1.6, jul=1.3))),
+    Stream("Monthly savings transfer", "Savings", TransactionType.EXPENSE, 0.5, 8000, 0.1, income_elasticity=1.2),
+    Stream("Groceries and dining", "Food & Dining", TransactionType.EXPENSE, 1.0, 650, 0.7, per_month=14,
+           season=tuple(seasonal(dec=1.2))),
+    Stream("Commute and fuel", "Transportation", TransactionType.EXPENSE, 0.95, 350, 0.6, per_month=10),
+    Stream("Shopping", "Shopping", TransactionType.EXPENSE, 0.9, 1800, 0.9, per_month=2.5,
+           season=tuple(seasonal(oct=1.8, nov=1.6, dec=1.3, jan=1.2))),
+    Stream("Movies and outings", "Entertainment", TransactionType.EXPENSE, 0.8, 900, 0.7, per_month=2.5,
+           season=tuple(seasonal(dec=1.5))),
+    Stream("Doctor and pharmacy", "Healthcare", TransactionType.EXPENSE, 0.7, 1500, 1.0, per_month=0.5,
+           income_elasticity=0.3),
+    Stream("Miscellaneous", "Miscellaneous", TransactionType.EXPENSE, 0.8, 400, 0.9, per_month=2),
+]
+
+MEDIAN_SALARY = 60000
+PAYDAYS = np.array([1, 1, 1, 25, 28, 30])
+COPY_COLUMNS = ("id", "user_id", "amount", "transaction_type", "category_id", "description", "created_at")
+
+
+def _numeric_hex(value: UUID) -> bool:
+    try:
+        float(value.hex)
+        return True
+    except ValueError:
+        return False
+
+
+def random_uuids(rng: np.random.Generator, count: int) -> List[UUID]:
+    # Drawn from the seeded generator so reruns produce the same ids
+    raw = rng.bytes(16 * count)
+    ids = [UUID(bytes=raw[i:i + 16], version=4) for i in range(0, 16 * count, 16)]
+    # SQLite gives UUID columns NUMERIC affinity, so a hex string like
+    # "1234e567..." is stored as a number and can collide (e.g. as inf).
+    # At millions of rows that happens; redraw those few ids.
+    ids = [value for value in ids if not _numeric_hex(value)]
+    if len(ids) < count:
+        ids += random_uuids(rng, count - len(ids))
+    return ids
+
+
+def month_grid(months: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Month starts (datetime64[s]), their lengths in seconds and calendar months, oldest first."""
+    current = np.datetime64(datetime.utcnow(), "M")
+    starts = np.arange(current - months + 1, current + 1)
+    lengths = ((starts + 1).astype("datetime64[s]") - starts.astype("datetime64[s]")).astype(np.int64)
+    calendar = starts.astype(np.int64) % 12  # 0 = January
+    return starts.astype("datetime64[s]"), lengths, calendar
+
+
+def sample_batch(rng: np.random.Generator, n: int, months: int) -> Dict[str, np.ndarray]:
+    """Transactions for a batch of n users as column arrays; "user" indexes into the batch."""
+    starts, lengths, calendar = month_grid(months)
+    now = np.datetime64(datetime.utcnow(), "s")
+
+    salary = MEDIAN_SALARY * rng.lognormal(0, 0.5, n)
+    income_factor = salary / MEDIAN_SALARY
+    payday = rng.choice(PAYDAYS, n)
+
+    columns = {"user": [], "offset": [], "month": [], "amount": [], "stream": []}
+    for index, stream in enumerate(STREAMS):
+        active = rng.random(n) < stream.participation
+        season = np.asarray(stream.season)[calendar]
+        if stream.per_month is None:
+            counts = np.repeat(active[:, None], months, axis=1).astype(np.int64)
+        else:
+            # Users differ in how often they spend, not just how much
+            rate = stream.per_month * rng.gamma(4.0, 0.25, n) * active
+            counts = rng.poisson(rate[:, None] * season[None, :])
+
+        cell = np.repeat(np.arange(n * months), counts.ravel())
+        user, month = np.divmod(cell, months)
+        if stream.per_month is None:
+            # Fixed day each month; salary on the user's payday, bills spread over the first week
+            day = payday[user] if stream.transaction_type == TransactionType.INCOME else rng.integers(1, 8, n)[user]
+            offset = np.minimum(day - 1, 27) * 86400 + rng.integers(8 * 3600, 20 * 3600, len(cell))
+        else:
+            offset = (rng.random(len(cell)) * lengths[month]).astype(np.int64)
+
+        amount = stream.amount * income_factor[user] ** stream.income_elasticity
+        if stream.per_month is None:
+            # Recurring bills vary in size with the season; discretionary spend varies in frequency
+            amount = amount * season[month]
+        amount = amount * rng.lognormal(0, stream.amount_sigma, len(cell))
+
+        columns["user"].append(user)
+        columns["offset"].append(offset)
+        columns["month"].append(month)
+        columns["amount"].append(np.round(amount, 2))
+        columns["stream"].append(np.full(len(cell), index))
+
+    batch = {key: np.concatenate(values) for key, values in columns.items()}
+    batch["created_at"] = starts[batch["month"]] + batch["offset"].astype("timedelta64[s]")
+    keep = batch["created_at"] <= now  # the current month is only partly elapsed
+    return {key: values[keep] for key, values in batch.items()}
+
+
+def batch_rows(rng: np.random.Generator, batch: Dict[str, np.ndarray], user_ids: List[UUID], category_ids: Dict[str, UUID]):
+    """Yield row dicts in the shape insert(Transaction) expects."""
+    ids = random_uuids(rng, len(batch["user"]))
+    created = batch["created_at"].astype("datetime64[us]").tolist()
+    for i, (user, amount, stream) in enumerate(zip(batch["user"].tolist(), batch["amount"].tolist(), batch["stream"].tolist())):
+        spec = STREAMS[stream]
+        yield {
+            "id": ids[i],
+            "user_id": user_ids[user],
+            "amount": amount,
+            "transaction_type": spec.transaction_type,
+            "category_id": category_ids[spec.category],
+            "description": spec.description,
+            "created_at": created[i],
+        }
+
+
+def batch_rollups(batch: Dict[str, np.ndarray], user_ids: List[UUID], months: int, category_ids: Dict[str, UUID]) -> List[Dict]:
+    """MonthlyRollup rows for a batch; the users are new, so there is nothing to merge with."""
+    buckets = sorted({(stream.category, stream.transaction_type) for stream in STREAMS}, key=lambda b: (b[0], b[1].value))
+    bucket_of_stream = np.array([buckets.index((stream.category, stream.transaction_type)) for stream in STREAMS])
+    key = (batch["user"] * months + batch["month"]) * len(buckets) + bucket_of_stream[batch["stream"]]
+    keys, inverse = np.unique(key, return_inverse=True)
+    totals = np.bincount(inverse, weights=batch["amount"])
+    counts = np.bincount(inverse)
+
+    labels = np.datetime_as_string(month_grid(months)[0].astype("datetime64[M]")).tolist()
+    rows = []
+    for key, total, count in zip(keys.tolist(), totals.tolist(), counts.tolist()):
+        cell, bucket = divmod(key, len(buckets))
+        user, month = divmod(cell, months)
+        category, transaction_type = buckets[bucket]
+        rows.append({
+            "user_id": user_ids[user],
+            "month": labels[month],
+            "category_id": category_ids[category],
+            "transaction_type": transaction_type,
+            "total": round(total, 2),
+            "count": count,
+        })
+    return rows
+
+
+def load_executemany(db: Session, rows, chunk_size: int) -> int:
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.execute(insert(Transaction), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(Transaction), chunk)
+        total += len(chunk)
+    return total
+
+
+def load_copy(db: Session, rows, chunk_size: int) -> int:
+    # COPY needs the raw psycopg2 cursor; enum columns store the member name
+    cursor = db.connection().connection.cursor()
+    statement = f"COPY transactions ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row["id"], row["user_id"], row["amount"], row["transaction_type"].name,
+            row["category_id"], row["description"], row["created_at"].isoformat(sep=" "),
+        ])
+        total += 1
+        if total % chunk_size == 0:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    return total
+
+
+def create_users(db: Session, rng: np.random.Generator, prefix: str, start: int, count: int, hashed: str) -> List[UUID]:
+    ids = random_uuids(rng, count)
+    balances = np.round(rng.lognormal(np.log(50000), 1.0, count), 2).tolist()
+    db.execute(insert(User), [
+        {
+            "id": ids[i],
+            "email": f"{prefix}{start + i}@example.com",
+            "username": f"{prefix}{start + i}",
+            "password": hashed,
+            "full_name": f"{prefix.title()} User {start + i}",
+            "initial_balance": balances[i],
+        }
+        for i in range(count)
+    ])
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="gen", help="usernames/emails are <prefix><n>[@example.com]")
+    parser.add_argument("--password", default="password", help="shared by all generated users")
+    parser.add_argument("--batch-users", type=int, default=500, help="users sampled per NumPy batch")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows per executemany/COPY call")
+    parser.add_argument("--no-copy", action="store_true", help="use executemany even on PostgreSQL")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2" and not args.no_copy
+    # Mix the prefix in so separate runs into one database don't draw the same ids
+    rng = np.random.default_rng([args.seed, zlib.crc32(args.prefix.encode())])
+    db = SessionLocal()
+    try:
+        seed_categories(db)
+        category_ids = {name: id for id, name in db.query(Category.id, Category.name)}
+        missing = {stream.category for stream in STREAMS} - set(category_ids)
+        if missing:
+            print(f"Missing categories: {', '.join(sorted(missing))}")
+            return
+        if db.query(User.id).filter(User.username == f"{args.prefix}0").first():
+            print(f"Users with prefix '{args.prefix}' already exist; pick another --prefix.")
+            return
+
+        hashed = hash_password(args.password)
+        started = time.perf_counter()
+        total = 0
+        for start in range(0, args.users, args.batch_users):
+            count = min(args.batch_users, args.users - start)
+            user_ids = create_users(db, rng, args.prefix, start, count, hashed)
+            batch = sample_batch(rng, count, args.months)
+            rows = batch_rows(rng, batch, user_ids, category_ids)
+            total += (load_copy if use_copy else load_executemany)(db, rows, args.chunk_size)
+            rollups = batch_rollups(batch, user_ids, args.months, category_ids)
+            for chunk in range(0, len(rollups), args.chunk_size):
+                db.execute(insert(MonthlyRollup), rollups[chunk:chunk + args.chunk_size])
+            db.commit()
+            elapsed = time.perf_counter() - started
+            print(f"{start + count}/{args.users} users, {total} transactions ({total / elapsed:.0f} rows/s)")
+        print(f"Done: {args.users} users, {total} transactions via {'COPY' if use_copy else 'executemany'} "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
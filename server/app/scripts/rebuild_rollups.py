@@ -0,0 +1,78 @@
+"""Rebuild the monthly rollup table from raw transactions.
+
+Use it to backfill after deploying the rollup table, or to repair drift.
+The rollups are also the month-to-date counters budgets are checked
+against, so a scheduled --current-month run keeps budget alerts and
+/budgets/status honest. Users are rebuilt in batches, each locked and
+committed on its own, so it can run while the app is serving writes:
+
+    python -m app.scripts.rebuild_rollups               # every user
+    python -m app.scripts.rebuild_rollups --user-id <uuid>
+    python -m app.scripts.rebuild_rollups --current-month
+"""
+import argparse
+import math
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select
+from app.db.database import SessionLocal, engine
+from app.db.model import Base, User
+from app.db.rollup import lock_users, month_bounds, month_key, rebuild_rollups, rollup_snapshot
+
+
+def drifted(before: dict, after: dict) -> int:
+    """Counters that the rebuild added, removed or changed."""
+    changed = 0
+    for key in before.keys() | after.keys():
+        old, new = before.get(key), after.get(key)
+        if old is None or new is None or old[1] != new[1] or not math.isclose(old[0], new[0], abs_tol=0.005):
+            changed += 1
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=UUID, default=None, help="Only rebuild this user's rollups")
+    parser.add_argument("--batch-size", type=int, default=500, help="users locked and committed together")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument("--month", help="Only rebuild this month (YYYY-MM)")
+    scope.add_argument("--current-month", action="store_true", help="Only rebuild the current (UTC) month")
+    args = parser.parse_args()
+
+    month = month_key(datetime.utcnow()) if args.current_month else args.month
+    if month is not None:
+        try:
+            month_bounds(month)
+        except ValueError:
+            parser.error(f"--month must be YYYY-MM, got {month}")
+
+    # Creates monthly_rollups if this is the first run
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if args.user_id is not None:
+            user_ids = [args.user_id]
+        else:
+            user_ids = db.scalars(select(User.id).order_by(User.id)).all()
+
+        count = changed = 0
+        for start in range(0, len(user_ids), args.batch_size):
+            batch = user_ids[start:start + args.batch_size]
+            # Locked before the snapshot too, so a concurrent write isn't counted as drift
+            lock_users(db, batch)
+            before = rollup_snapshot(db, batch, month)
+            count += rebuild_rollups(db, batch, month)
+            changed += drifted(before, rollup_snapshot(db, batch, month))
+            # Releases this batch's locks before the next one is taken
+            db.commit()
+        print(f"Rebuilt {count} rollup rows for {len(user_ids)} users, corrected {changed}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -27,25 +27,25 @@ DEFAULT_CATEGORIES = {
     ]
 }
 
-def seed_categories(db: Session):
-    # Check if categories already exist
-    existing_categories = db.query(Category).all()
-    if existing_categories:
+def seed_categories(db: Session) -> int:
+    # Insert only the categories that are missing, so this is safe to re-run
+    existing = {name for (name,) in db.query(Category.name)}
+    missing = [
+        name
+        for names in DEFAULT_CATEGORIES.values()
+        for name in names
+        if name not in existing
+    ]
+    if not missing:
         print("Categories already seeded. Skipping...")
-        return
-
-    # Add expense categories
-    for category_name in DEFAULT_CATEGORIES["expense"]:
-        category = Category(name=category_name)
-        db.add(category)
+        return 0
 
-    # Add income categories
-    for category_name in DEFAULT_CATEGORIES["income"]:
-        category = Category(name=category_name)
-        db.add(category)
+    for category_name in missing:
+        db.add(Category(name=category_name))
 
     db.commit()
-    print("Categories seeded successfully!")
+    print(f"Categories seeded successfully! ({len(missing)} added)")
+    return len(missing)
 
 def main():
     # Create all tables
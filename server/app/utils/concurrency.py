@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers that
+    arrive while it is in flight (followers) get the leader's result, or
+    its exception. Nothing is kept once the call lands, so this is not a
+    cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key: Hashable) -> Optional[Future]:
+        """The in-flight call for key, if any, without starting one."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+            return future
+
+    def lead(self, key: Hashable) -> Tuple[Future, bool]:
+        """(future, True) if the caller must run the work and land() it, else (in-flight future, False)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def land(self, key: Hashable, future: Future, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        future, leader = self.lead(key)
+        if not leader:
+            return future.result(timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.land(key, future, error=e)
+            raise
+        self.land(key, future, result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class ConcurrencyLimiter:
+    """A global cap plus a per-key cap on concurrent work, with a bounded wait."""
+
+    def __init__(self, limit: int, per_key_limit: int, timeout: float):
+        self.limit = limit
+        self.per_key_limit = per_key_limit
+        self.timeout = timeout
+        self._global = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        # key -> [semaphore, holders + waiters]; dropped when nobody references it
+        self._per_key: Dict[Hashable, list] = {}
+        self.active = 0
+        self.rejected = 0
+
+    def _key_slot(self, key: Hashable) -> threading.BoundedSemaphore:
+        with self._lock:
+            entry = self._per_key.get(key)
+            if entry is None:
+                entry = self._per_key[key] = [threading.BoundedSemaphore(self.per_key_limit), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _drop_key(self, key: Hashable):
+        with self._lock:
+            entry = self._per_key[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._per_key[key]
+
+    def acquire(self, key: Hashable) -> bool:
+        """Wait up to timeout for both a per-key and a global slot; False if either isn't free."""
+        deadline = time.monotonic() + self.timeout
+        key_slot = self._key_slot(key)
+        if not key_slot.acquire(timeout=self.timeout):
+            self._drop_key(key)
+            self._reject()
+            return False
+        if not self._global.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            key_slot.release()
+            self._drop_key(key)
+            self._reject()
+            return False
+        with self._lock:
+            self.active += 1
+        return True
+
+    def release(self, key: Hashable):
+        with self._lock:
+            self.active -= 1
+            key_slot = self._per_key[key][0]
+        self._global.release()
+        key_slot.release()
+        self._drop_key(key)
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
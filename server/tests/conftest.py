@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Tests import the app as the server does, from the server directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app creates its engines at import: point them at a scratch database,
+# and keep insights offline
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+os.environ.setdefault("LLM_PROVIDER", "fake")
@@ -0,0 +1,90 @@
+"""analyze_history on hand-built rollup and recent-expense arrays."""
+from datetime import datetime
+import numpy as np
+from app.ai.analytics import MonthlyTotals, RecentExpenses, analyze_history
+
+TODAY = datetime(2024, 6, 15)
+CATEGORIES = ["Groceries", "Rent"]
+
+
+def day(value: str) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def monthly_totals(rows):
+    """rows: (month "YYYY-MM", category index, is_income, total)."""
+    months, categories, is_income, totals = zip(*rows)
+    return MonthlyTotals(
+        months=np.array(months, dtype="datetime64[M]").astype(np.int64),
+        totals=np.array(totals, dtype=np.float64),
+        is_income=np.array(is_income, dtype=bool),
+        categories=np.array(categories, dtype=np.int16),
+        category_names=CATEGORIES,
+    )
+
+
+def recent_expenses(rows):
+    """rows: (date "YYYY-MM-DD", category index, amount)."""
+    days, categories, amounts = zip(*rows)
+    return RecentExpenses(
+        days=np.array([day(d) for d in days], dtype=np.int64),
+        amounts=np.array(amounts, dtype=np.float64),
+        categories=np.array(categories, dtype=np.int16),
+        category_names=CATEGORIES,
+    )
+
+
+TOTALS = monthly_totals([
+    ("2024-04", 0, False, 400.0),
+    ("2024-04", 1, False, 1000.0),
+    ("2024-04", 0, True, 3000.0),
+    ("2024-05", 0, False, 10500.0),
+    ("2024-05", 1, False, 1000.0),
+    ("2024-05", 0, True, 3000.0),
+])
+
+
+def test_flags_clear_outlier_in_small_category():
+    # Scored with itself in the mean and spread, the 10000 would only reach z=2.24
+    recent = recent_expenses(
+        [(f"2024-05-0{i}", 0, 100.0) for i in range(1, 6)] + [("2024-05-20", 0, 10000.0)]
+    )
+
+    anomalies = analyze_history(TOTALS, recent, 0.0, today=TODAY)["anomalies"]
+
+    assert len(anomalies) == 1
+    assert anomalies[0]["category"] == "Groceries"
+    assert anomalies[0]["amount"] == 10000.0
+    assert anomalies[0]["date"] == "2024-05-20"
+    assert anomalies[0]["category_mean"] == 100.0
+
+
+def test_ordinary_spread_is_not_flagged():
+    recent = recent_expenses([
+        ("2024-05-01", 0, 90.0), ("2024-05-02", 0, 110.0), ("2024-05-03", 0, 100.0),
+        ("2024-05-04", 0, 95.0), ("2024-05-05", 0, 105.0), ("2024-05-06", 0, 120.0),
+        # Identical amounts: no spread at all, and nothing unusual
+        ("2024-05-01", 1, 1000.0), ("2024-05-02", 1, 1000.0), ("2024-05-03", 1, 1000.0),
+        ("2024-05-04", 1, 1000.0), ("2024-05-05", 1, 1000.0),
+    ])
+
+    assert analyze_history(TOTALS, recent, 0.0, today=TODAY)["anomalies"] == []
+
+
+def test_too_few_samples_are_not_flagged():
+    recent = recent_expenses([("2024-05-01", 0, 100.0), ("2024-05-02", 0, 100.0), ("2024-05-03", 0, 5000.0)])
+
+    assert analyze_history(TOTALS, recent, 0.0, today=TODAY)["anomalies"] == []
+
+
+def test_monthly_series_and_forecast():
+    advanced = analyze_history(TOTALS, recent_expenses([("2024-05-01", 0, 100.0)]), 500.0, today=TODAY)
+
+    # The current month is listed but incomplete, so comparisons use April and May
+    assert advanced["months"] == ["2024-04", "2024-05", "2024-06"]
+    assert advanced["savings_rate_pct"] == [round((3000 - 1400) / 3000 * 100, 1), round((3000 - 11500) / 3000 * 100, 1), None]
+    assert advanced["category_mom"]["month"] == "2024-05"
+    assert advanced["category_mom"]["changes"]["Groceries"]["change_pct"] == 2525.0
+    assert advanced["category_mom"]["changes"]["Rent"]["change_pct"] == 0.0
+    assert advanced["forecast"]["based_on_months"] == 2
+    assert advanced["forecast"]["next_month_income"] == 3000.0
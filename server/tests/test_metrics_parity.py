@@ -0,0 +1,127 @@
+"""compute_metrics (read from monthly_rollups) against the original per-transaction loop."""
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.ai.metrics import compute_metrics
+from app.db.model import Base, Category, Transaction, TransactionType, User
+from app.db.rollup import apply_to_rollup, rebuild_rollups
+
+INITIAL_BALANCE = 1000.0
+
+
+def baseline_metrics(transactions, initial_balance):
+    """The metrics as analyze_transactions computed them before the rollup existed."""
+    total_income = sum(t.amount for t in transactions if t.transaction_type.value == 'income')
+    total_expenses = sum(t.amount for t in transactions if t.transaction_type.value == 'expense')
+    current_balance = initial_balance + total_income - total_expenses
+
+    expense_by_category = {}
+    for t in transactions:
+        if t.transaction_type.value == 'expense':
+            cat = t.category.name
+            expense_by_category[cat] = expense_by_category.get(cat, 0) + t.amount
+
+    monthly_data = {}
+    for t in transactions:
+        if t.created_at:
+            month_key = t.created_at.strftime("%Y-%m")
+            monthly_data.setdefault(month_key, {"income": 0, "expenses": 0})
+            if t.transaction_type.value == 'income':
+                monthly_data[month_key]["income"] += t.amount
+            else:
+                monthly_data[month_key]["expenses"] += t.amount
+
+    return {
+        "total_income": total_income,
+        "total_expenses": total_expenses,
+        "current_balance": current_balance,
+        "expense_by_category": expense_by_category,
+        "monthly_trends": monthly_data,
+    }
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def seed(db, rng, incremental):
+    categories = [Category(id=uuid4(), name=f"Category {i}") for i in range(8)]
+    users = [
+        User(id=uuid4(), email=f"user{i}@example.com", username=f"user{i}", password="x", full_name="User")
+        for i in range(2)
+    ]
+    db.add_all(categories + users)
+    db.flush()
+
+    start = datetime(2023, 1, 1)
+    transactions = [
+        Transaction(
+            id=uuid4(),
+            user_id=rng.choice(users).id,
+            amount=round(rng.uniform(1, 5000), 2),
+            transaction_type=TransactionType.INCOME if rng.random() < 0.2 else TransactionType.EXPENSE,
+            category_id=rng.choice(categories).id,
+            description=None,
+            # About 25 months, including month boundaries
+            created_at=start + timedelta(seconds=rng.randrange(0, 760 * 24 * 3600)),
+        )
+        for _ in range(2000)
+    ]
+    db.add_all(transactions)
+    db.flush()
+
+    if incremental:
+        # As the write endpoints maintain it: one delta per transaction
+        for t in transactions:
+            apply_to_rollup(db, [{
+                "user_id": t.user_id,
+                "created_at": t.created_at,
+                "category_id": t.category_id,
+                "transaction_type": t.transaction_type,
+                "amount": t.amount,
+            }])
+    else:
+        rebuild_rollups(db)
+    db.commit()
+    return users
+
+
+def assert_close(actual, expected):
+    assert actual["total_income"] == pytest.approx(expected["total_income"])
+    assert actual["total_expenses"] == pytest.approx(expected["total_expenses"])
+    assert actual["current_balance"] == pytest.approx(expected["current_balance"])
+    assert actual["expense_by_category"] == pytest.approx(expected["expense_by_category"])
+    assert actual["monthly_trends"].keys() == expected["monthly_trends"].keys()
+    for month, totals in expected["monthly_trends"].items():
+        assert actual["monthly_trends"][month] == pytest.approx(totals), month
+
+
+@pytest.mark.parametrize("incremental", [False, True], ids=["rebuilt", "incremental"])
+@pytest.mark.parametrize("seed_value", [1, 2, 3])
+def test_compute_metrics_matches_per_transaction_loop(db, seed_value, incremental):
+    users = seed(db, random.Random(seed_value), incremental)
+
+    for user in users:
+        transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
+        assert transactions
+        assert_close(compute_metrics(db, user.id, INITIAL_BALANCE), baseline_metrics(transactions, INITIAL_BALANCE))
+
+
+def test_compute_metrics_without_transactions(db):
+    user = User(id=uuid4(), email="empty@example.com", username="empty", password="x", full_name="Empty")
+    db.add(user)
+    db.commit()
+
+    assert_close(compute_metrics(db, user.id, INITIAL_BALANCE), baseline_metrics([], INITIAL_BALANCE))
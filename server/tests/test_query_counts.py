@@ -0,0 +1,62 @@
+"""Queries per request on the hot routes, as counted by ProfilingMiddleware.
+
+A change that adds a query (or an N+1) to one of these routes fails here;
+update the expected count only if the extra query is intended.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.db.database import engine
+from app.db.model import Base
+from app.main import app
+from app.observability.profiling import ProfilingMiddleware
+from app.scripts.seed import seed_categories
+
+
+@pytest.fixture(scope="module")
+def client():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        seed_categories(db)
+
+    # Wrapped here rather than via PROFILING_ENABLED, which is read at import
+    with TestClient(ProfilingMiddleware(app)) as client:
+        client.post("/auth/register", json={
+            "email": "counts@example.com", "username": "counts", "password": "secret1", "full_name": "Counts",
+        })
+        token = client.post("/auth/login", json={"email": "counts@example.com", "password": "secret1"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        # Later requests find the user in the principal cache
+        client.get("/auth/me")
+        yield client
+
+
+def query_count(response) -> int:
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-DB-Query-Count"])
+
+
+def test_route_query_counts(client):
+    categories = client.get("/transactions/categories").json()
+    expense = next(c for c in categories if c["name"] == "Food & Dining")
+    income = next(c for c in categories if c["name"] == "Salary")
+
+    created = [
+        client.post("/transactions", json={"amount": 50000, "transaction_type": "income", "category_id": income["id"]}),
+        client.post("/transactions", json={"amount": 1200, "transaction_type": "expense", "category_id": expense["id"]}),
+    ]
+    # Version bump, insert, rollup upsert; expenses also check their budget
+    assert [query_count(r) for r in created] == [3, 4]
+
+    # Independent of the number of rows
+    for _ in range(20):
+        client.post("/transactions", json={"amount": 300, "transaction_type": "expense", "category_id": expense["id"]})
+    # Data version for the ETag, then one joined SELECT
+    assert query_count(client.get("/transactions")) == 2
+    assert query_count(client.get("/transactions", params={"limit": 0})) == 2
+
+    # Data state, the rollup totals and the recent expenses for the anomalies
+    assert query_count(client.get("/transactions/insights")) == 3
+    # Served from the insights cache after the data state check
+    assert query_count(client.get("/transactions/insights")) == 1